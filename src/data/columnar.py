@@ -0,0 +1,109 @@
+"""
+A minimal columnar on-disk format for DatetimeIndex-ed frames
+
+Each frame is a directory holding one .npy file per column, one for the index,
+and a json schema. Columns can then be read, or memory-mapped, one at a time,
+without parsing anything. Text columns are stored as category codes, with the
+categories in the schema, so that every column on disk is a fixed width array
+"""
+import json
+import os
+import pathlib
+import shutil
+
+import numpy as np
+import pandas as pd
+
+
+SCHEMA_FILE = '_schema.json'
+INDEX_FILE = '_index.npy'
+
+
+def _column_file(position):
+    # Column names may not be valid file names, so files are named by position
+    return f'col_{position:04d}.npy'
+
+
+def write_frame(df: pd.DataFrame, path, metadata=None):
+    """
+    Writes a DatetimeIndex-ed DataFrame to the directory path, replacing it if it exists
+    Numeric, boolean and datetime columns are written as they are, anything else is
+    written as category codes
+    metadata is an optional dict of json serialisable values kept in the schema
+    The frame is written to a temporary directory first, so readers never see part of it
+    """
+    path = pathlib.Path(path)
+    tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    if tmp_path.exists():
+        shutil.rmtree(tmp_path)
+    tmp_path.mkdir(parents=True)
+
+    np.save(tmp_path / INDEX_FILE, df.index.values.astype('datetime64[ns]'))
+
+    columns = []
+    for position, (name, series) in enumerate(df.items()):
+        column = {'name': name, 'file': _column_file(position)}
+        if (pd.api.types.is_numeric_dtype(series.dtype)
+                or pd.api.types.is_bool_dtype(series.dtype)
+                or pd.api.types.is_datetime64_dtype(series.dtype)):
+            values = series.values
+        else:
+            categorical = pd.Categorical(series)
+            values = categorical.codes
+            column['categories'] = [str(category) for category in categorical.categories]
+        column['dtype'] = str(values.dtype)
+        np.save(tmp_path / column['file'], values)
+        columns.append(column)
+
+    schema = {'index_name': df.index.name,
+              'n_rows': len(df),
+              'columns': columns,
+              'metadata': metadata or {}}
+    (tmp_path / SCHEMA_FILE).write_text(json.dumps(schema, indent=2, default=str))
+
+    if path.exists():
+        shutil.rmtree(path)
+    os.replace(tmp_path, path)
+
+
+def read_schema(path):
+    """
+    Returns the schema dict of a frame directory
+    """
+    return json.loads((pathlib.Path(path) / SCHEMA_FILE).read_text())
+
+
+def read_frame(path, columns=None, mmap=True) -> pd.DataFrame:
+    """
+    Reads a frame directory written by write_frame
+    columns restricts the read to those columns, in that order
+    With mmap, the column files are memory-mapped copy-on-write, and the numeric columns of
+    the frame are views of those maps rather than copies, so only the pages that are used
+    are read from disk. Writing to the frame never changes the files. Category columns are
+    decoded, so are always read into memory
+    Returns a DatetimeIndex-ed DataFrame
+    """
+    path = pathlib.Path(path)
+    schema = read_schema(path)
+    mmap_mode = 'c' if mmap else None
+
+    stored = {column['name']: column for column in schema['columns']}
+    if columns is None:
+        columns = list(stored)
+    missing = [name for name in columns if name not in stored]
+    if missing:
+        raise KeyError(f'Columns not in {path}: {missing}')
+
+    data = {}
+    for name in columns:
+        column = stored[name]
+        values = np.load(path / column['file'], mmap_mode=mmap_mode)
+        if 'categories' in column:
+            values = pd.Categorical.from_codes(np.asarray(values), categories=column['categories'])
+        data[name] = values
+
+    index = pd.DatetimeIndex(np.load(path / INDEX_FILE, mmap_mode=mmap_mode),
+                             name=schema['index_name'])
+    # copy=False keeps each column a view of its map, instead of consolidating them into
+    # one block per dtype
+    return pd.DataFrame(data, index=index, columns=columns, copy=False)
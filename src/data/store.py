@@ -0,0 +1,145 @@
+"""
+A year-partitioned columnar store of the merged hourly demand, weather and calendar data
+
+The merge of notebook 03.05 is run once, by build_hourly_store, and written with compact
+dtypes to <store_dir>/year=<YYYY>/, one columnar frame per year (see src.data.columnar).
+load_hourly and iter_hourly then read only the years and columns an experiment asks for,
+memory-mapped a year at a time, instead of every notebook re-parsing the demand and weather CSVs
+
+Run from the project root:
+    python -m src.data.store
+"""
+import pathlib
+
+import numpy as np
+import pandas as pd
+
+from src.data.columnar import read_frame, write_frame
+
+
+PROJECT_DIR = pathlib.Path(__file__).resolve().parents[2]
+IMPUTED_DATA_DIR_DEMAND = PROJECT_DIR / 'data' / '03-imputed' / 'demand'
+CALCULATED_FEATURES_DATA_DIR_CALENDAR = PROJECT_DIR / 'data' / '03-calculated-features' / 'calendar'
+IMPUTED_DATA_DIR_WEATHER = PROJECT_DIR / 'data' / '03-imputed' / 'weather-toronto'
+HOURLY_STORE_DIR = PROJECT_DIR / 'data' / '05-clean' / 'hourly-store'
+
+CALENDAR_COLS = ['hour_of_day', 'year', 'month', 'day_of_week', 'day_of_year', 'week_of_year',
+                 'quarter']
+
+
+def compact_dtypes(df: pd.DataFrame, float_dtype=np.float32,
+                   integer_cols=CALENDAR_COLS) -> pd.DataFrame:
+    """
+    Returns a copy of df with compact dtypes:
+    integer_cols without missing values become the smallest integer type that holds them,
+    other numeric columns become float_dtype, and text columns become categories
+    Demand stays a float, so differences between demands cannot overflow
+    """
+    df = df.copy()
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_bool_dtype(series.dtype):
+            continue
+        if pd.api.types.is_numeric_dtype(series.dtype):
+            if col in integer_cols and series.notna().all():
+                df[col] = pd.to_numeric(series, downcast='integer')
+            else:
+                df[col] = series.astype(float_dtype)
+        elif not pd.api.types.is_datetime64_any_dtype(series.dtype):
+            df[col] = series.astype('category')
+    return df
+
+
+def merge_hourly(demand_df, weather_df, calendar_df) -> pd.DataFrame:
+    """
+    Merges the imputed hourly demand, weather and calendar frames as in notebook 03.05
+    Adds the daily_peak column, and drops the hours without demand
+    """
+    demand_df = demand_df.rename(columns={'ont_demand': 'hourly_demand'})
+    feat_df = pd.concat([calendar_df, demand_df], axis=1, sort=True)
+    df = pd.concat([weather_df, feat_df], axis=1, sort=True)
+    df = df.join(feat_df.groupby(by=['year', 'day_of_year'])['hourly_demand'].max(),
+                 on=['year', 'day_of_year'], rsuffix='_peak_in_day_in_year')
+    df = df.rename(columns={'hourly_demand_peak_in_day_in_year': 'daily_peak'})
+    return df.dropna(subset=['hourly_demand'])
+
+
+def write_hourly_store(df: pd.DataFrame, store_dir=HOURLY_STORE_DIR, float_dtype=np.float32):
+    """
+    Writes a DatetimeIndex-ed hourly frame to store_dir, one partition per year
+    Text columns share one set of categories across every year, so they stay
+    categorical when years are loaded together
+    Returns the list of years written
+    """
+    store_dir = pathlib.Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    df = compact_dtypes(df, float_dtype=float_dtype)
+
+    years = []
+    for year, year_df in df.groupby(df.index.year):
+        write_frame(year_df, store_dir / f'year={year}', metadata={'year': int(year)})
+        years.append(int(year))
+    return years
+
+
+def stored_years(store_dir=HOURLY_STORE_DIR):
+    """
+    Returns the sorted list of years in the store
+    """
+    return sorted(int(path.name[len('year='):])
+                  for path in pathlib.Path(store_dir).glob('year=*'))
+
+
+def _requested_years(store_dir, years):
+    available = stored_years(store_dir)
+    if years is None:
+        return available
+    years = sorted(int(year) for year in years)
+    missing = sorted(set(years) - set(available))
+    if missing:
+        raise KeyError(f'Years not in {store_dir}: {missing}')
+    return years
+
+
+def iter_hourly(store_dir=HOURLY_STORE_DIR, years=None, columns=None):
+    """
+    Accepts an optional iterable of years and list of columns
+    Yields (year, DataFrame) pairs in time order, each frame memory-mapped, so only the
+    pages a computation touches are read, and the whole history is never in memory at once
+    """
+    store_dir = pathlib.Path(store_dir)
+    for year in _requested_years(store_dir, years):
+        yield year, read_frame(store_dir / f'year={year}', columns=columns)
+
+
+def load_hourly(store_dir=HOURLY_STORE_DIR, years=None, columns=None) -> pd.DataFrame:
+    """
+    Accepts an optional iterable of years and list of columns
+    Reads the requested columns of the requested years only
+    A single year is returned memory-mapped. Several years are concatenated, which copies
+    them into memory: use iter_hourly to work through a long history a year at a time
+    Returns a DataFrame indexed by hour, in time order
+    """
+    frames = [frame for _, frame in iter_hourly(store_dir, years, columns)]
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames)
+
+
+def build_hourly_store(store_dir=HOURLY_STORE_DIR):
+    """
+    Reads the imputed demand, weather and calendar CSVs, merges them, and writes the store
+    Returns the list of years written
+    """
+    calendar_df = pd.read_csv(CALCULATED_FEATURES_DATA_DIR_CALENDAR / 'calendar.csv',
+                              index_col=0, parse_dates=True)
+    demand_df = pd.read_csv(IMPUTED_DATA_DIR_DEMAND / 'demand.csv', index_col=0, parse_dates=True)
+    weather_df = pd.read_csv(IMPUTED_DATA_DIR_WEATHER / 'weather_toronto.csv',
+                             index_col=0, parse_dates=True, dtype={'weather': object})
+    df = merge_hourly(demand_df, weather_df, calendar_df)
+    return write_hourly_store(df, store_dir)
+
+
+if __name__ == '__main__':
+    years = build_hourly_store()
+    print(f'Wrote {len(years)} years to {HOURLY_STORE_DIR}')
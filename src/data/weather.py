@@ -0,0 +1,220 @@
+"""
+Downloads hourly Environment Canada weather into a local columnar store
+
+Replaces src/raw-data/wget-bulk-weather.txt. Each station-month is one bulk data
+request. Months are fetched concurrently by a bounded pool of threads, each with its own
+requests Session (Sessions are not thread safe), with retries, and each CSV is parsed
+straight into a columnar partition (see src.data.columnar). Only months that are
+missing from the store, or were fetched before the month was complete, are requested
+again, so a run that fails part way resumes where it stopped
+
+Run from the project root:
+    python -m src.data.weather
+"""
+import datetime
+import io
+import pathlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from src.data.columnar import read_schema, write_frame, read_frame
+
+
+PROJECT_DIR = pathlib.Path(__file__).resolve().parents[2]
+WEATHER_STORE_DIR = PROJECT_DIR / 'data' / '01-raw' / 'weather-toronto-store'
+
+BULK_URL = 'http://climate.weather.gc.ca/climate_data/bulk_data_e.html'
+
+# Toronto Pearson. Station 5097 was replaced by 51459 in 2013. Years are inclusive
+STATIONS = {5097: (1953, 2013),
+            51459: (2013, 2019)}
+
+COLUMN_RENAMES = {'Date/Time': 'date',
+                  'Date/Time (LST)': 'date',
+                  'Temp (°C)': 'temp',
+                  'Dew Point Temp (°C)': 'dew_point_temp',
+                  'Rel Hum (%)': 'rel_hum',
+                  'Wind Spd (km/h)': 'wind_speed',
+                  'Visibility (km)': 'visibility',
+                  'Stn Press (kPa)': 'press',
+                  'Hmdx': 'hmdx',
+                  'Wind Chill': 'wind_chill',
+                  'Weather': 'weather'}
+
+WEATHER_COLS = ['temp', 'dew_point_temp', 'rel_hum', 'wind_speed', 'visibility',
+                'press', 'hmdx', 'wind_chill', 'weather']
+
+# Observations can be revised for a few days after a month ends
+SETTLE_PERIOD = datetime.timedelta(days=7)
+
+
+def parse_weather_csv(text) -> pd.DataFrame:
+    """
+    Accepts the text of a bulk data CSV, with or without its metadata preamble
+    Returns a DataFrame of WEATHER_COLS indexed by date, without the hours that have no temp,
+    as in format_weather_file of notebook 03.03
+    """
+    text = text.lstrip('\ufeff')
+    header_start = text.find('"Date/Time')
+    if header_start == -1:
+        raise ValueError('No "Date/Time" header found in weather CSV')
+
+    df = pd.read_csv(io.StringIO(text[header_start:]))
+    df = df.rename(columns=COLUMN_RENAMES)
+    df['date'] = pd.to_datetime(df['date'])
+    df = df.set_index('date')
+    df = df.reindex(columns=WEATHER_COLS)
+    df['weather'] = df['weather'].astype(object)
+    df = df[df['temp'].notna()]
+    return df.sort_index()
+
+
+def partition_path(store_dir, station_id, year, month):
+    return pathlib.Path(store_dir) / f'station={station_id}' / f'{year:04d}-{month:02d}'
+
+
+def station_months(stations=STATIONS):
+    """
+    Returns a list of every (station_id, year, month) to download
+    """
+    return [(station_id, year, month)
+            for station_id, (first_year, last_year) in stations.items()
+            for year in range(first_year, last_year + 1)
+            for month in range(1, 13)]
+
+
+def is_stale(store_dir, station_id, year, month, now=None, settle_period=SETTLE_PERIOD):
+    """
+    A station-month is stale if it is not in the store, or if it was fetched before
+    the month ended plus the settle period, so it may have been incomplete
+    """
+    path = partition_path(store_dir, station_id, year, month)
+    try:
+        fetched = read_schema(path)['metadata']['fetched']
+    except (FileNotFoundError, KeyError):
+        return True
+
+    now = now or datetime.datetime.now()
+    month_end = datetime.datetime(year + month // 12, month % 12 + 1, 1)
+    complete_after = month_end + settle_period
+    return now < complete_after or datetime.datetime.fromisoformat(fetched) < complete_after
+
+
+def make_session(max_workers=8, retries=5, backoff_factor=0.5):
+    """
+    Returns a requests Session that keeps at most max_workers connections open, and retries
+    failed connections and 5xx responses with an exponential backoff
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(total=retries, backoff_factor=backoff_factor,
+                  status_forcelist=[500, 502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers,
+                          max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def fetch_month(session, store_dir, station_id, year, month, base_url=BULK_URL, timeout=60):
+    """
+    Downloads a single station-month, and writes it to the store
+    Returns the number of hours stored
+    """
+    params = {'format': 'csv', 'stationID': station_id, 'Year': year, 'Month': month,
+              'Day': 14, 'timeframe': 1, 'submit': 'Download Data'}
+    response = session.get(base_url, params=params, timeout=timeout)
+    response.raise_for_status()
+    response.encoding = 'utf-8-sig'
+
+    df = parse_weather_csv(response.text)
+    write_frame(df, partition_path(store_dir, station_id, year, month),
+                metadata={'station_id': station_id, 'year': year, 'month': month,
+                          'fetched': datetime.datetime.now().isoformat(timespec='seconds')})
+    return len(df)
+
+
+def ingest_weather(store_dir=WEATHER_STORE_DIR, stations=STATIONS, base_url=BULK_URL,
+                   max_workers=8, force=False, now=None, retries=5, backoff_factor=0.5):
+    """
+    Downloads every missing or stale station-month into store_dir
+    force refetches every month
+    Each worker thread makes its own session with make_session(1, retries, backoff_factor)
+    A month that still fails after its retries doesn't stop the others. Once every month
+    has been tried, a RuntimeError lists the failed months, and the next run fetches only those
+    Returns a dict of {(station_id, year, month): hours stored} for the months fetched
+    """
+    store_dir = pathlib.Path(store_dir)
+    todo = [key for key in station_months(stations)
+            if force or is_stale(store_dir, *key, now=now)]
+    if not todo:
+        return {}
+
+    local = threading.local()
+    sessions = []
+
+    def fetch(key):
+        if not hasattr(local, 'session'):
+            local.session = make_session(1, retries, backoff_factor)
+            sessions.append(local.session)
+        return fetch_month(local.session, store_dir, *key, base_url=base_url)
+
+    fetched, failed = {}, {}
+    try:
+        with ThreadPoolExecutor(max_workers) as pool:
+            futures = {pool.submit(fetch, key): key for key in todo}
+            for future in as_completed(futures):
+                try:
+                    fetched[futures[future]] = future.result()
+                except Exception as error:
+                    failed[futures[future]] = error
+    finally:
+        for session in sessions:
+            session.close()
+
+    if failed:
+        first_key = min(failed)
+        raise RuntimeError(f'{len(failed)} of {len(todo)} station-months failed, '
+                           f'rerun to fetch them: {sorted(failed)}') from failed[first_key]
+    return fetched
+
+
+def load_weather(store_dir=WEATHER_STORE_DIR, start=None, end=None, columns=None) -> pd.DataFrame:
+    """
+    Reads the stored station-months into one DataFrame indexed by date
+    start and end are optional dates limiting the months read
+    Where the stations overlap, the hours of the earlier station are kept
+    """
+    store_dir = pathlib.Path(store_dir)
+    start = None if start is None else pd.Timestamp(start).to_period('M')
+    end = None if end is None else pd.Timestamp(end).to_period('M')
+
+    frames = []
+    for station_dir in sorted(store_dir.glob('station=*'),
+                              key=lambda path: int(path.name[len('station='):])):
+        for path in sorted(station_dir.iterdir()):
+            if path.name.startswith('.'):
+                continue
+            period = pd.Period(path.name, freq='M')
+            if (start is not None and period < start) or (end is not None and period > end):
+                continue
+            frames.append(read_frame(path, columns=columns, mmap=False))
+
+    if not frames:
+        return pd.DataFrame(columns=columns or WEATHER_COLS,
+                            index=pd.DatetimeIndex([], name='date'))
+    df = pd.concat(frames)
+    if 'weather' in df.columns:
+        df['weather'] = df['weather'].astype(object)
+    df = df[~df.index.duplicated(keep='first')]
+    return df.sort_index()
+
+
+if __name__ == '__main__':
+    fetched = ingest_weather()
+    print(f'Fetched {len(fetched)} station-months into {WEATHER_STORE_DIR}')
@@ -1,5 +1,6 @@
 from sklearn.base import BaseEstimator, TransformerMixin
 import numpy as np
+import pandas as pd
 
 
 class CyclicalToCycle(BaseEstimator, TransformerMixin):
@@ -58,3 +59,337 @@ class CyclicalToCycle(BaseEstimator, TransformerMixin):
         X.drop([self.cycle_name], axis=1, inplace=True)
 
         return X
+
+
+class CyclicalEncoder(BaseEstimator, TransformerMixin):
+    """ A transformer that replaces any number of cyclical columns with their sin and cosine
+    values, in a single pass over the data
+    Parameters
+    ----------
+    cycles : dict
+        Maps each cyclical column to its number of periods per cycle,
+        e.g. {'hmdxx_max_hour': 24, 'day_of_week': 5}. Column positions are used
+        as keys when transforming NumPy arrays.
+    dtype : numpy dtype, default=np.float64
+        The dtype of the sin and cosine values, np.float32 halves their memory.
+    copy : bool, default=True
+        If False, DataFrames are modified in place, and returned.
+    Attributes
+    ----------
+    n_features_in_ : int
+        The number of features of the data passed to :meth:`fit`.
+    feature_names_in_ : ndarray of str
+        The column names of the DataFrame passed to :meth:`fit`, if one was.
+    """
+
+    def __init__(self, cycles=None, dtype=np.float64, copy=True):
+        self.cycles = cycles
+        self.dtype = dtype
+        self.copy = copy
+
+    def fit(self, X, y=None):
+        """Records the input features
+        Parameters
+        ----------
+        X : {DataFrame, ndarray}, shape (n_samples, n_features)
+            The training input samples.
+        y : None
+            There is no need of a target in a transformer, yet the pipeline API
+            requires this parameter.
+        Returns
+        -------
+        self : object
+            Returns self.
+        """
+        self.n_features_in_ = X.shape[1]
+        if isinstance(X, pd.DataFrame):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        return self
+
+    def _table(self, period):
+        # The sin and cosine of every position in a cycle, built once per period
+        tables = self.__dict__.setdefault('_tables', {})
+        if (period, self.dtype) not in tables:
+            angles = 2 * np.pi * np.arange(int(period)) / period
+            tables[(period, self.dtype)] = (np.sin(angles).astype(self.dtype),
+                                            np.cos(angles).astype(self.dtype))
+        return tables[(period, self.dtype)]
+
+    def _encode(self, values, period):
+        # Whole numbers with a whole number period are looked up, anything else is computed
+        if float(period).is_integer() and (np.issubdtype(values.dtype, np.integer)
+                                           or np.array_equal(values, np.floor(values))):
+            sin_table, cos_table = self._table(period)
+            positions = values.astype(np.int64) % int(period)
+            return sin_table[positions], cos_table[positions]
+        angles = values * (2 * np.pi / period)
+        return (np.sin(angles).astype(self.dtype, copy=False),
+                np.cos(angles).astype(self.dtype, copy=False))
+
+    def transform(self, X):
+        """Replaces each cyclical column with sin_<column> and cos_<column>,
+        appended after the remaining columns
+        Parameters
+        ----------
+        X : {DataFrame, ndarray}, shape (n_samples, n_features)
+            The input samples.
+        Returns
+        -------
+        X_transformed : {DataFrame, ndarray}, shape (n_samples, n_features + n_cycles)
+            A DataFrame if X is one, otherwise an ndarray of dtype.
+        """
+        cycles = self.cycles or {}
+        if isinstance(X, pd.DataFrame):
+            if self.copy:
+                # A shallow copy, the untouched columns are not copied
+                X = X.copy(deep=False)
+            for name, period in cycles.items():
+                X['sin_' + str(name)], X['cos_' + str(name)] = self._encode(X[name].values,
+                                                                            period)
+            X.drop(columns=list(cycles), inplace=True)
+            return X
+
+        X = np.asarray(X)
+        keep = [col for col in range(X.shape[1]) if col not in cycles]
+        X_transformed = np.empty((X.shape[0], len(keep) + 2 * len(cycles)), dtype=self.dtype)
+        X_transformed[:, :len(keep)] = X[:, keep]
+        for i, (col, period) in enumerate(cycles.items()):
+            position = len(keep) + 2 * i
+            X_transformed[:, position], X_transformed[:, position + 1] = self._encode(X[:, col],
+                                                                                      period)
+        return X_transformed
+
+    def get_feature_names_out(self, input_features=None):
+        """Returns the output feature names
+        Parameters
+        ----------
+        input_features : array-like of str, default=None
+            The input feature names, defaults to those seen in :meth:`fit`,
+            or x0, x1, ... for arrays.
+        Returns
+        -------
+        feature_names_out : ndarray of str
+        """
+        if input_features is None:
+            input_features = getattr(self, 'feature_names_in_',
+                                     ['x' + str(i) for i in range(self.n_features_in_)])
+        input_features = list(input_features)
+        cycles = self.cycles or {}
+        if hasattr(self, 'feature_names_in_'):
+            cycle_names = list(cycles)
+        else:
+            cycle_names = [input_features[col] for col in cycles]
+        names = [name for name in input_features if name not in cycle_names]
+        for name in cycle_names:
+            names += ['sin_' + str(name), 'cos_' + str(name)]
+        return np.asarray(names, dtype=object)
+
+
+DAILY_FEATURES = ['temp', 'dew_point_temp', 'rel_hum', 'visibility', 'press', 'hmdxx']
+DAILY_STATS = ['min', 'max', 'mean', 'median']
+
+NS_PER_DAY = 24 * 60 * 60 * 10 ** 9
+
+
+def daily_features(hourly, features=DAILY_FEATURES):
+    """
+    Accepts an hourly DataFrame indexed by date and time
+    Returns a DataFrame indexed by day, with the min, max, mean and median of each feature,
+    and the earliest hour of the day with its highest and lowest value, as in notebook 06.01
+    Hours are NaN on days where the feature is missing for every hour
+    """
+    day = hourly.index.normalize().rename('date')
+    grouped = hourly[features].groupby(day)
+    stats = grouped.agg(DAILY_STATS)
+
+    hours = pd.Series(hourly.index.hour, index=hourly.index, dtype=float)
+    columns = {}
+    for feature in features:
+        for stat in DAILY_STATS:
+            columns[feature + '_' + stat] = stats[(feature, stat)]
+        for stat in ('max', 'min'):
+            is_extreme = hourly[feature] == grouped[feature].transform(stat)
+            columns[feature + '_' + stat + '_hour'] = hours.where(is_extreme).groupby(day).min()
+    return pd.DataFrame(columns)
+
+
+class DailyFeatureAggregator:
+    """ Builds the daily_features frame incrementally from a stream of hourly rows
+    Keeps a buffer of the hours of every day seen so far. Each update only recomputes
+    the days that received new rows, so its cost grows with the new rows, not the history.
+    A row for an hour that is already buffered replaces it, so revised data can be resent
+    The result is identical to daily_features on the full hourly history
+    """
+
+    def __init__(self, features=DAILY_FEATURES):
+        self.features = list(features)
+        self._buffers = {}
+        self._updates = []
+        self._daily = None
+
+    def update(self, hourly):
+        """
+        Accepts new hourly rows indexed by date and time
+        Returns the recomputed daily features of the days the rows fall in
+        """
+        times = hourly.index.values.astype('datetime64[ns]').astype(np.int64)
+        values = hourly[self.features].values.astype(float)
+        order = np.argsort(times, kind='stable')
+        times, values = times[order], values[order]
+
+        days = times // NS_PER_DAY
+        affected, starts = np.unique(days, return_index=True)
+        ends = np.append(starts[1:], len(days))
+
+        merged_times, merged_values = [], []
+        for day, start, end in zip(affected, starts, ends):
+            day_times, day_values = times[start:end], values[start:end]
+            if day in self._buffers:
+                old_times, old_values = self._buffers[day]
+                day_times = np.concatenate([old_times, day_times])
+                day_values = np.concatenate([old_values, day_values])
+            # Keep the last row sent for each hour, in time order
+            last = len(day_times) - 1 - np.unique(day_times[::-1], return_index=True)[1]
+            self._buffers[day] = (day_times[last], day_values[last])
+            merged_times.append(day_times[last])
+            merged_values.append(day_values[last])
+
+        if not merged_times:
+            return daily_features(hourly.iloc[:0], self.features)
+        # Back to the resolution of the rows sent, as daily_features on them would give
+        index = pd.DatetimeIndex(np.concatenate(merged_times)).astype(hourly.index.dtype)
+        affected_hourly = pd.DataFrame(np.concatenate(merged_values), columns=self.features,
+                                       index=index)
+        daily = daily_features(affected_hourly, self.features)
+        self._updates.append(daily)
+        self._daily = None
+        return daily
+
+    def daily_features(self):
+        """
+        Returns the daily features of every day seen so far
+        """
+        if self._daily is None:
+            if not self._updates:
+                return pd.DataFrame()
+            daily = pd.concat(self._updates)
+            daily = daily[~daily.index.duplicated(keep='last')].sort_index()
+            self._updates = [daily]
+            self._daily = daily
+        return self._daily
+
+
+# Environment Canada's humidex, with the vapour pressure from the dew point
+HUMIDEX_E_CONSTANT = 5417.7530
+# Magnus coefficients for the dew point over water, valid from -45 to 60 C
+MAGNUS_B = 17.625
+MAGNUS_C = 243.04
+
+
+def humidex(temp, dew_point_temp):
+    """
+    Accepts arrays of temperature and dew point in C
+    Returns the humidex, NaN where either input is NaN
+    """
+    temp = np.asarray(temp, dtype=float)
+    dew_point_temp = np.asarray(dew_point_temp, dtype=float)
+    vapour_pressure = 6.11 * np.exp(HUMIDEX_E_CONSTANT
+                                    * (1 / 273.16 - 1 / (273.15 + dew_point_temp)))
+    return temp + (5 / 9) * (vapour_pressure - 10)
+
+
+def wind_chill(temp, wind_speed):
+    """
+    Accepts arrays of temperature in C and wind speed in km/h
+    Returns Environment Canada's wind chill index, using the light wind formula below 5 km/h
+    NaN above 10 C, where the index is not defined, or where either input is NaN
+    """
+    temp = np.asarray(temp, dtype=float)
+    wind_speed = np.asarray(wind_speed, dtype=float)
+    with np.errstate(invalid='ignore'):
+        wind_factor = wind_speed ** 0.16
+        index = np.where(wind_speed >= 5,
+                         13.12 + 0.6215 * temp - 11.37 * wind_factor + 0.3965 * temp * wind_factor,
+                         temp + (-1.59 + 0.1345 * temp) / 5 * wind_speed)
+        return np.where(temp <= 10, index, np.nan)
+
+
+def dew_point(temp, rel_hum):
+    """
+    Accepts arrays of temperature in C and relative humidity in %
+    Returns the dew point from the Magnus formula, NaN where the humidity is not positive
+    or either input is NaN
+    """
+    temp = np.asarray(temp, dtype=float)
+    rel_hum = np.asarray(rel_hum, dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        gamma = (np.log(np.where(rel_hum > 0, rel_hum, np.nan) / 100)
+                 + MAGNUS_B * temp / (MAGNUS_C + temp))
+        return MAGNUS_C * gamma / (MAGNUS_B - gamma)
+
+
+class _WeatherIndex(BaseEstimator, TransformerMixin):
+    # Subclasses set _function, and name the input columns in _input_params
+    _function = None
+    _input_params = ()
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        """
+        Accepts a DataFrame holding the input columns
+        Returns a shallow copy with output_col filled where it is missing, or added if absent
+        Rows with missing inputs are left missing
+        """
+        X = X.copy(deep=False)
+        inputs = [X[getattr(self, param)].values for param in self._input_params]
+        computed = self._function(*inputs).astype(self.dtype, copy=False)
+        if self.output_col in X.columns:
+            current = X[self.output_col].values.astype(self.dtype)
+            computed = np.where(np.isnan(current), computed, current)
+        X[self.output_col] = computed
+        return X
+
+
+class Humidex(_WeatherIndex):
+    """ A transformer that fills missing humidex values from the temperature and dew point
+    """
+    _function = staticmethod(humidex)
+    _input_params = ('temp_col', 'dew_point_col')
+
+    def __init__(self, temp_col='temp', dew_point_col='dew_point_temp', output_col='hmdx',
+                 dtype=np.float64):
+        self.temp_col = temp_col
+        self.dew_point_col = dew_point_col
+        self.output_col = output_col
+        self.dtype = dtype
+
+
+class WindChill(_WeatherIndex):
+    """ A transformer that fills missing wind chill values from the temperature and wind speed
+    """
+    _function = staticmethod(wind_chill)
+    _input_params = ('temp_col', 'wind_speed_col')
+
+    def __init__(self, temp_col='temp', wind_speed_col='wind_speed', output_col='wind_chill',
+                 dtype=np.float64):
+        self.temp_col = temp_col
+        self.wind_speed_col = wind_speed_col
+        self.output_col = output_col
+        self.dtype = dtype
+
+
+class DewPoint(_WeatherIndex):
+    """ A transformer that fills missing dew points from the temperature and relative humidity
+    Place it before Humidex in a pipeline, so the humidex can use the filled dew points
+    """
+    _function = staticmethod(dew_point)
+    _input_params = ('temp_col', 'rel_hum_col')
+
+    def __init__(self, temp_col='temp', rel_hum_col='rel_hum', output_col='dew_point_temp',
+                 dtype=np.float64):
+        self.temp_col = temp_col
+        self.rel_hum_col = rel_hum_col
+        self.output_col = output_col
+        self.dtype = dtype
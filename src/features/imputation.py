@@ -0,0 +1,204 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+HOURS_PER_DAY = 24
+DAYS_PER_YEAR = 365.25
+
+
+def _daily_mean(hourly_values):
+    # Days with no values at all have a NaN mean, without the empty slice warning
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nanmean(hourly_values, axis=1)
+
+
+def missing_runs(missing):
+    """
+    Accepts a boolean array of missing days
+    Returns a list of (first position, number of days) of each run of missing days
+    """
+    missing = np.concatenate([[False], np.asarray(missing, dtype=bool), [False]])
+    edges = np.flatnonzero(np.diff(missing.astype(np.int8)))
+    return [(start, end - start) for start, end in zip(edges[::2], edges[1::2])]
+
+
+class AnalogImputer:
+    """ Fills gaps of whole days in hourly data with the hours of an analog window
+    The automated form of the imputation in notebook 03.02: a gap is filled from the window
+    of the same length whose days fall on the same weekdays, at a similar time of year
+    (within season_days), that is closest in mean match_col (e.g. temperature) and in time.
+    Windows are scored by |difference in mean match_col| + time_weight * |offset in years|.
+    When match_col is itself missing over the gap, the nearest window in time is used
+    Holidays are then lined up: a holiday in the gap takes the donor window's day with the
+    same holiday, and a gap day whose donor is a holiday takes the nearest non-holiday day
+    on the same weekday instead, so e.g. Christmas Day is filled from Christmas Day
+    fit precomputes the daily hours, completeness and mean match_col of the whole history
+    as cumulative sums, so every candidate window is scored in a single vectorised pass.
+    update appends newly loaded days, and transform fills the gaps of any frame within or
+    after the fitted history. Outliers, like the 2003 blackout, are filled by setting them
+    to NaN first. Isolated missing hours are better interpolated, as in notebook 03.03
+
+    columns: the columns to fill, e.g. ['ont_demand']
+    holidays: an optional Series indexed by day of holiday names, e.g. from the holidays
+        package, or of booleans such as the calendar's stat_hol. Names only match the same
+        name, while True matches the holiday nearest the same date of the year
+    Every filled gap is recorded in imputations_, so the imputation can be reviewed
+    """
+
+    def __init__(self, columns, match_col='temp', holidays=None, season_days=21,
+                 time_weight=0.5):
+        self.columns = list(columns)
+        self.match_col = match_col
+        self.holidays = holidays
+        self.season_days = season_days
+        self.time_weight = time_weight
+
+    def _daily_values(self, hourly, days):
+        hours = pd.date_range(days[0], periods=len(days) * HOURS_PER_DAY, freq='60min')
+        values = hourly[self.columns].reindex(hours).values.astype(float)
+        match = hourly[self.match_col].reindex(hours).values.astype(float)
+        return (values.reshape(len(days), HOURS_PER_DAY, len(self.columns)),
+                match.reshape(len(days), HOURS_PER_DAY))
+
+    def _index(self):
+        # Cumulative sums give the totals of any window of days in constant time
+        complete = ~np.isnan(self.values_).any(axis=(1, 2))
+        self.cum_complete_ = np.concatenate([[0], np.cumsum(complete)])
+        has_match = ~np.isnan(self.daily_match_)
+        self.cum_match_ = np.concatenate([[0.0], np.cumsum(np.where(has_match,
+                                                                    self.daily_match_, 0.0))])
+        self.cum_match_days_ = np.concatenate([[0], np.cumsum(has_match)])
+
+        labels = np.full(len(self.days_), None, dtype=object)
+        if self.holidays is not None:
+            holidays = self.holidays[self.holidays.astype(bool)]
+            holidays.index = pd.DatetimeIndex(holidays.index).normalize()
+            positions = self.days_.get_indexer(holidays.index)
+            labels[positions[positions >= 0]] = holidays.values[positions >= 0]
+        self.holiday_labels_ = labels
+
+    def fit(self, hourly):
+        """
+        Accepts the hourly history, indexed by date and time, with columns and match_col
+        """
+        self.days_ = pd.date_range(hourly.index.min().normalize(),
+                                   hourly.index.max().normalize(), freq='D')
+        self.values_, match = self._daily_values(hourly, self.days_)
+        self.daily_match_ = _daily_mean(match)
+        self.imputations_ = []
+        self._index()
+        return self
+
+    def update(self, hourly):
+        """
+        Accepts newly loaded hourly rows, and appends the days after the fitted history
+        """
+        last_day = hourly.index.max().normalize()
+        if last_day <= self.days_[-1]:
+            return self
+        new_days = pd.date_range(self.days_[-1] + pd.Timedelta(days=1), last_day, freq='D')
+        values, match = self._daily_values(hourly, new_days)
+        daily_match = _daily_mean(match)
+        self.days_ = self.days_.append(new_days)
+        self.values_ = np.concatenate([self.values_, values])
+        self.daily_match_ = np.concatenate([self.daily_match_, daily_match])
+        self._index()
+        return self
+
+    def find_analog(self, start, n_days):
+        """
+        Accepts the position of a gap's first day in the fitted days, and its length
+        Returns the position of the best donor window's first day and its score,
+        or (None, nan) when no complete window qualifies
+        """
+        n_total = len(self.days_)
+        weeks = np.arange(-(start // 7), (n_total - start - n_days) // 7 + 1)
+        donors = start + 7 * weeks
+        donors = donors[np.abs(donors - start) >= n_days]
+
+        complete = self.cum_complete_[donors + n_days] - self.cum_complete_[donors] == n_days
+        day_of_year = self.days_.dayofyear.values
+        season_gap = np.abs(day_of_year[donors] - day_of_year[start])
+        in_season = np.minimum(season_gap, 365 - season_gap) <= self.season_days
+        donors = donors[complete & in_season]
+        if not len(donors):
+            return None, np.nan
+
+        scores = self.time_weight * np.abs(donors - start) / DAYS_PER_YEAR
+        gap_match_days = self.cum_match_days_[start + n_days] - self.cum_match_days_[start]
+        if gap_match_days:
+            gap_mean = (self.cum_match_[start + n_days] - self.cum_match_[start]) / gap_match_days
+            with np.errstate(invalid='ignore', divide='ignore'):
+                donor_means = ((self.cum_match_[donors + n_days] - self.cum_match_[donors])
+                               / (self.cum_match_days_[donors + n_days]
+                                  - self.cum_match_days_[donors]))
+            # Windows without any match_col values rank last
+            match_gaps = np.abs(donor_means - gap_mean)
+            scores = scores + np.where(np.isnan(match_gaps), np.inf, match_gaps)
+        best = np.argmin(scores)
+        return int(donors[best]), float(scores[best])
+
+    def _align_holidays(self, start, n_days, donor_start):
+        """
+        Returns the donor day position of each gap day, with the holidays lined up
+        """
+        donors = donor_start + np.arange(n_days)
+        labels = self.holiday_labels_
+        if self.holidays is None:
+            return donors
+
+        day_of_year = self.days_.dayofyear.values
+        lo, hi = max(donor_start - 7, 0), min(donor_start + n_days + 7, len(self.days_))
+        nearby = np.arange(lo, hi)
+        nearby = nearby[self.cum_complete_[nearby + 1] - self.cum_complete_[nearby] == 1]
+        for offset in range(n_days):
+            target = start + offset
+            if labels[target] is not None:
+                same = nearby[np.array([labels[day] == labels[target] for day in nearby],
+                                       dtype=bool)]
+                if len(same):
+                    season_gap = np.abs(day_of_year[same] - day_of_year[target])
+                    donors[offset] = same[np.argmin(np.minimum(season_gap, 365 - season_gap))]
+            elif labels[donors[offset]] is not None:
+                # The nearest non-holiday day on the same weekday
+                plain = nearby[np.array([labels[day] is None for day in nearby], dtype=bool)]
+                plain = plain[(plain - donors[offset]) % 7 == 0]
+                if len(plain):
+                    donors[offset] = plain[np.argmin(np.abs(plain - donors[offset]))]
+        return donors
+
+    def transform(self, hourly):
+        """
+        Accepts hourly data within or after the fitted history
+        Returns a copy with the missing values of columns, on every day with any missing,
+        filled from the analog days
+        """
+        self.update(hourly)
+        first = self.days_.get_loc(hourly.index.min().normalize())
+        last = self.days_.get_loc(hourly.index.max().normalize())
+        values, _ = self._daily_values(hourly, self.days_[first:last + 1])
+        missing_days = np.isnan(values).any(axis=(1, 2))
+
+        filled = values.copy()
+        for run_start, n_days in missing_runs(missing_days):
+            start = first + run_start
+            donor_start, score = self.find_analog(start, n_days)
+            if donor_start is None:
+                continue
+            donors = self._align_holidays(start, n_days, donor_start)
+            gap = filled[run_start:run_start + n_days]
+            filled[run_start:run_start + n_days] = np.where(np.isnan(gap),
+                                                            self.values_[donors], gap)
+            self.imputations_.append({'start': self.days_[start], 'n_days': n_days,
+                                      'donor_start': self.days_[donor_start], 'score': score,
+                                      'donor_days': self.days_[donors]})
+
+        hours = pd.date_range(self.days_[first], periods=filled.shape[0] * HOURS_PER_DAY,
+                              freq='60min')
+        filled = pd.DataFrame(filled.reshape(-1, len(self.columns)), index=hours,
+                              columns=self.columns).reindex(hourly.index)
+        hourly = hourly.copy()
+        hourly[self.columns] = filled.values
+        return hourly
@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, RegressorMixin
+
+
+class AnalogDayIndex(BaseEstimator, RegressorMixin):
+    """ A persistent nearest neighbour index of historical days, for analog-day forecasts
+    fit scales the daily features and builds a KD-tree (or ball tree) over them once.
+    kneighbors and neighbours return the most similar historical days to new days, e.g.
+    tomorrow's forecast weather, and predict averages their targets, typically the
+    residuals of a time series model, as KNeighborsRegressor would
+    The fitted index pickles with its tree, so it is saved and loaded with the model
+    (see ModelRegistry) without being rebuilt
+    append adds new days without a rebuild: they are kept in a buffer that is searched by
+    brute force alongside the tree, and folded into a new tree once the buffer holds more
+    than rebuild_fraction of the indexed days. The scaling is fixed at fit, so appended
+    days never move the existing ones
+
+    features: the columns to index, all of X's columns by default
+    weights: "uniform", or "distance" for inverse distance weighting
+    algorithm: "kd_tree" or "ball_tree"
+    """
+
+    def __init__(self, features=None, n_neighbors=10, weights="distance", algorithm="kd_tree",
+                 leaf_size=40, rebuild_fraction=0.25):
+        self.features = features
+        self.n_neighbors = n_neighbors
+        self.weights = weights
+        self.algorithm = algorithm
+        self.leaf_size = leaf_size
+        self.rebuild_fraction = rebuild_fraction
+
+    def _scale(self, X):
+        if isinstance(X, pd.DataFrame):
+            X = X[self.features_]
+        return (np.asarray(X, dtype=float) - self.center_) / self.scale_
+
+    def _build(self):
+        from sklearn.neighbors import BallTree, KDTree
+
+        tree_class = {"kd_tree": KDTree, "ball_tree": BallTree}[self.algorithm]
+        self.tree_ = tree_class(self.points_, leaf_size=self.leaf_size)
+        self.n_indexed_ = len(self.points_)
+
+    def fit(self, X, y):
+        """
+        Accepts daily features X and the target of each day, e.g. model residuals
+        """
+        self.features_ = list(X.columns) if self.features is None else list(self.features)
+        values = np.asarray(X[self.features_], dtype=float)
+        self.center_ = values.mean(axis=0)
+        self.scale_ = values.std(axis=0)
+        self.scale_[self.scale_ == 0] = 1.0
+
+        self.points_ = self._scale(values)
+        self.targets_ = np.asarray(y, dtype=float)
+        self.days_ = pd.Index(X.index)
+        self._build()
+        return self
+
+    def append(self, X, y):
+        """
+        Adds new days to the index, rebuilding the tree only when the buffer of
+        days outside it grows past rebuild_fraction of the indexed days
+        """
+        self.points_ = np.vstack([self.points_, self._scale(X)])
+        self.targets_ = np.concatenate([self.targets_, np.asarray(y, dtype=float)])
+        self.days_ = self.days_.append(pd.Index(X.index))
+        if len(self.points_) - self.n_indexed_ > self.rebuild_fraction * self.n_indexed_:
+            self._build()
+        return self
+
+    def kneighbors(self, X, n_neighbors=None):
+        """
+        Returns the (distances, positions) of each day's nearest indexed days,
+        each an array of shape (len(X), n_neighbors), nearest first
+        """
+        n_neighbors = n_neighbors or self.n_neighbors
+        points = self._scale(X)
+        n_neighbors = min(n_neighbors, len(self.points_))
+
+        distances, positions = self.tree_.query(points, k=min(n_neighbors, self.n_indexed_))
+        buffered = self.points_[self.n_indexed_:]
+        if len(buffered):
+            buffer_distances = np.sqrt(((points[:, np.newaxis, :]
+                                         - buffered[np.newaxis, :, :]) ** 2).sum(axis=2))
+            buffer_positions = np.broadcast_to(np.arange(self.n_indexed_, len(self.points_)),
+                                               buffer_distances.shape)
+            distances = np.hstack([distances, buffer_distances])
+            positions = np.hstack([positions, buffer_positions])
+            order = np.argsort(distances, axis=1, kind="stable")[:, :n_neighbors]
+            distances = np.take_along_axis(distances, order, axis=1)
+            positions = np.take_along_axis(positions, order, axis=1)
+        return distances, positions
+
+    def neighbours(self, X, n_neighbors=None):
+        """
+        Returns a DataFrame of each day's analog days, one row per (day, rank),
+        with the analog day, its distance in scaled feature space and its target
+        """
+        distances, positions = self.kneighbors(X, n_neighbors)
+        n_days, k = positions.shape
+        return pd.DataFrame({"day": np.repeat(np.asarray(X.index), k),
+                             "rank": np.tile(np.arange(1, k + 1), n_days),
+                             "analog_day": np.asarray(self.days_)[positions.ravel()],
+                             "distance": distances.ravel(),
+                             "target": self.targets_[positions.ravel()]})
+
+    def predict(self, X):
+        """
+        Returns the (weighted) mean target of each day's nearest indexed days
+        """
+        distances, positions = self.kneighbors(X)
+        targets = self.targets_[positions]
+        if self.weights == "uniform":
+            yhat = targets.mean(axis=1)
+        else:
+            # As KNeighborsRegressor, exact matches take all the weight
+            with np.errstate(divide="ignore"):
+                weights = 1.0 / distances
+            exact = np.isinf(weights)
+            exact_rows = exact.any(axis=1)
+            weights[exact_rows] = exact[exact_rows]
+            yhat = (weights * targets).sum(axis=1) / weights.sum(axis=1)
+        return pd.Series(yhat, index=X.index) if isinstance(X, pd.DataFrame) else yhat
@@ -0,0 +1,70 @@
+"""
+Compares the seasonal AR and Fourier seasonality modes of SK_SARIMAX on the daily peak dataset
+
+Run from the project root:
+    python -m src.models.benchmark
+"""
+import pathlib
+import time
+
+import pandas as pd
+from sklearn.metrics import mean_absolute_error
+
+from src.models.models import SK_SARIMAX
+from src.utils.utils import RollingAnnualTimeSeriesSplit, bound_precision
+
+
+PROJECT_DIR = pathlib.Path(__file__).resolve().parents[2]
+CLEAN_DATA_DIR = PROJECT_DIR / 'data' / '05-clean'
+
+EXOG_COLS = ['hmdxx_min', 'hmdxx_max', 'hmdxx_median-1', 'temp_min', 'temp_max',
+             'dew_point_temp_max', 'visibility_mean']
+
+
+def benchmark_sarimax_modes(X, y, cv_splitter, models):
+    """
+    Accepts a dict of {mode name: SK_SARIMAX}
+    Fits and predicts every model on every split, timing each step
+    Returns a DataFrame of fit time, predict time, mae and bound precision
+    per mode and validation fold
+    """
+    rows = []
+    for name, model in models.items():
+        for fold, (train_indx, val_indx) in enumerate(cv_splitter.split(X)):
+            X_train, y_train = X.iloc[train_indx], y.iloc[train_indx]
+            X_test, y_test = X.iloc[val_indx], y.iloc[val_indx]
+
+            start = time.perf_counter()
+            model.fit(X_train, y_train)
+            fit_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            y_pred = model.predict(X_test)
+            predict_time = time.perf_counter() - start
+
+            rows.append({'mode': name,
+                         'fold': fold,
+                         'fit_time': fit_time,
+                         'predict_time': predict_time,
+                         'mae': mean_absolute_error(y_test, y_pred),
+                         'bound_precision': bound_precision(y_test, y_pred)})
+    return pd.DataFrame(rows)
+
+
+def main(n_splits=5):
+    df = pd.read_csv(CLEAN_DATA_DIR / 'clean-features.csv', parse_dates=True, index_col=0)
+    df = df.loc['1994': '2008']
+    y = df.pop('daily_peak')
+    X = df[EXOG_COLS]
+
+    models = {'seasonal_ar': SK_SARIMAX(order=(1, 0, 1), seasonal_order=(1, 0, 0, 96), trend='c'),
+              'fourier': SK_SARIMAX(order=(1, 0, 1), seasonal_order=(1, 0, 0, 96), trend='c',
+                                    fourier_order=4)}
+    results = benchmark_sarimax_modes(X, y, RollingAnnualTimeSeriesSplit(n_splits, goback_years=5),
+                                      models)
+    print(results.groupby('mode')[['fit_time', 'predict_time', 'mae', 'bound_precision']].mean())
+    return results
+
+
+if __name__ == '__main__':
+    main()
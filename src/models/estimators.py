@@ -0,0 +1,536 @@
+import collections
+import copy
+import sys
+import time
+
+import pandas as pd
+import numpy as np
+from sklearn.base import BaseEstimator, RegressorMixin
+
+# The sklearn-style model wrappers, also importable from src.models.models
+# statsmodels and fbprophet are imported inside the methods that use them
+
+
+def _statsmodels_version():
+    import statsmodels
+    return tuple(int(part) for part in statsmodels.__version__.split('.')[:2])
+
+
+# results.append, apply and extend were added in statsmodels 0.11
+STATSMODELS_UPDATES = (0, 11)
+
+
+class SK_SARIMAX(BaseEstimator, RegressorMixin):
+    """ A universal sklearn-style wrapper for statsmodels regressors
+
+    warm_start: when refitted, start the MLE optimisation from the previous fit's parameters
+    update_mode: None re-optimises on every fit. When the model is already fitted:
+        "append" - if the new data is the previous data plus new rows (expanding folds),
+                   the new rows are appended to the fitted results, keeping the parameters
+        "refilter" - the previous parameters are re-used and the filter is re-run over
+                     the new data (works for rolling folds too)
+        Either falls back to a (warm-started) fit when the data doesn't allow it, or when
+        statsmodels is older than 0.11, which has no results.append or apply
+    Every fit appends a record of its mode, number of observations, optimiser
+    iterations and wall time to fit_history_
+    fourier_order: None models the seasonality with the seasonal AR terms in seasonal_order.
+        An integer K drops the seasonal AR terms, and instead appends K sine / cosine pairs
+        with the seasonal_order period to exog, in both fit and predict. This keeps the
+        state vector small, so fitting and forecasting are much faster for long periods.
+        The terms are counted in rows from the start of the fit data, like the seasonal lag
+    """
+
+    def __init__(self, order=(2, 0, 1), seasonal_order=(2, 0, 0, 96), trend="c",
+                 warm_start=False, update_mode=None, fourier_order=None):
+        self.order = order
+        self.seasonal_order = seasonal_order
+        self.trend = trend
+        self.warm_start = warm_start
+        self.update_mode = update_mode
+        self.fourier_order = fourier_order
+
+    def _model_seasonal_order(self):
+        if self.fourier_order:
+            return (0, 0, 0, 0)
+        return self.seasonal_order
+
+    def _exog(self, X, start):
+        """
+        Returns X with the Fourier terms for rows start, start + 1, ... appended
+        """
+        if not self.fourier_order:
+            return X
+        period = self.seasonal_order[3]
+        steps = np.arange(start, start + len(X))[:, np.newaxis]
+        harmonics = np.arange(1, self.fourier_order + 1)[np.newaxis, :]
+        angles = 2 * np.pi * harmonics * steps / period
+        columns = ([f"sin_fourier_{k}" for k in range(1, self.fourier_order + 1)]
+                   + [f"cos_fourier_{k}" for k in range(1, self.fourier_order + 1)])
+        fourier = pd.DataFrame(np.hstack([np.sin(angles), np.cos(angles)]),
+                               index=X.index, columns=columns)
+        return pd.concat([X, fourier], axis=1)
+
+    def _same_exog(self, X):
+        return list(X.columns) == list(self.fit_X.columns)
+
+    def _extends_previous(self, X, y):
+        # The new data must start with exactly the data the results were fitted on
+        n_prev = len(self.fit_y)
+        return (
+            len(y) > n_prev
+            and self._same_exog(X)
+            and y.index[:n_prev].equals(self.fit_y.index)
+            and y.iloc[:n_prev].equals(self.fit_y)
+        )
+
+    def fit(self, X, y):
+        start_time = time.perf_counter()
+        previous = getattr(self, "results", None)
+        can_update = previous is not None and _statsmodels_version() >= STATSMODELS_UPDATES
+
+        if can_update and self.update_mode == "append" and self._extends_previous(X, y):
+            n_prev = len(self.fit_y)
+            self.results = previous.append(y.iloc[n_prev:], exog=self._exog(X, 0).iloc[n_prev:])
+            mode = "append"
+        elif can_update and self.update_mode == "refilter" and self._same_exog(X):
+            self.results = previous.apply(y, exog=self._exog(X, 0))
+            mode = "refilter"
+        else:
+            from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+            model = SARIMAX(
+                y,
+                order=self.order,
+                seasonal_order=self._model_seasonal_order(),
+                trend=self.trend,
+                exog=self._exog(X, 0),
+            )
+            start_params = None
+            if (self.warm_start and previous is not None
+                    and list(previous.param_names) == list(model.param_names)):
+                start_params = previous.params.values
+            self.results = model.fit(start_params=start_params)
+            mode = "fit" if start_params is None else "warm"
+
+        self.fit_X = X
+        self.fit_y = y
+        self.model = self.results.model
+
+        retvals = getattr(self.results, "mle_retvals", None) or {}
+        if mode not in ("fit", "warm"):
+            retvals = {}
+        if not hasattr(self, "fit_history_"):
+            self.fit_history_ = []
+        self.fit_history_.append({
+            "mode": mode,
+            "n_obs": len(y),
+            "iterations": retvals.get("iterations", 0),
+            "fit_time": time.perf_counter() - start_time,
+        })
+        return self.model
+
+    def predict(self, X, y=None):
+        self.predict_X = X
+        # Forecasts continue on from the end of the fit data
+        exog = self._exog(X, len(self.fit_y))
+        self.forecast_object = self.results.get_forecast(steps=len(X), exog=exog)
+        self.conf_int = self.forecast_object.conf_int()
+        self.ser = pd.Series(
+            data=self.forecast_object.predicted_mean.values, index=self.predict_X.index
+        )
+        return self.ser
+
+
+    def get_pred_values(self):
+        # All Data is only available after fit and predict
+        # Build a return DataFrame that looks similar to the prophet output
+        # date index y | yhat| yhat_lower | yhat_upper | is_forecast
+        fitted = self.fit_y.copy(deep=True)
+        fitted.name = "y"
+        fitted = pd.DataFrame(fitted)
+        fitted["is_forecast"] = 0
+        fitted["yhat"] = self.results.predict()
+
+        ser = self.ser.copy(deep=True)
+        predict_y = pd.DataFrame(self.ser, columns=["yhat"])
+        predict_y["is_forecast"] = 1
+
+        conf_ints = pd.DataFrame(
+            self.forecast_object.conf_int().values,
+            index=predict_y.index,
+            columns=["yhat_lower", "yhat_upper"],
+        )
+
+        unknown = pd.concat([predict_y, conf_ints], axis=1, sort=True)
+
+        full_suite = pd.concat([fitted, unknown], axis=0, sort=True)
+        full_suite = full_suite[
+            ["y", "yhat", "yhat_lower", "yhat_upper", "is_forecast"]
+        ]
+
+        return full_suite
+
+    
+    
+def _prophet_class():
+    # Prophet was published as fbprophet until 1.0
+    try:
+        from fbprophet import Prophet
+    except ImportError:
+        from prophet import Prophet
+    return Prophet
+
+
+def _prophet_version(model):
+    package = sys.modules[type(model).__module__.split('.')[0]]
+    return tuple(int(part) for part in package.__version__.split('.')[:2])
+
+
+def _with_interval_columns(forecast_object):
+    """
+    Returns a Prophet forecast frame made without uncertainty samples with the interval
+    columns of a sampled forecast added as NaN, in the places Prophet.predict puts them
+    """
+    columns = list(forecast_object.columns)
+    position = max(columns.index(col) for col in ('trend', 'cap', 'floor') if col in columns) + 1
+    base, components = columns[:position], [col for col in columns[position:] if col != 'yhat']
+    ordered = base + ['yhat_lower', 'yhat_upper', 'trend_lower', 'trend_upper']
+    for component in components:
+        if not component.endswith(('_lower', '_upper')):
+            ordered += [component, component + '_lower', component + '_upper']
+    ordered.append('yhat')
+    return forecast_object.reindex(columns=ordered)
+
+
+class SK_Prophet(BaseEstimator, RegressorMixin):
+    """ A universal sklearn-style wrapper for Prophet
+
+    regressors: {column: params}, where params is empty for Prophet's defaults,
+        (prior_scale, mode) or (prior_scale, standardize, mode)
+    daily_seasonality, seasonalities, seasonality_mode: configure the Prophet model.
+        seasonalities is a sequence of (name, period, fourier_order)
+    uncertainty_samples: number of Monte Carlo draws used for yhat_lower / yhat_upper
+    point_forecast_only: build the model without uncertainty samples, so predict skips the
+        sampling altogether, leaving the interval columns (yhat_lower, yhat_upper, ...) as NaN.
+        Cross validation scoring only reads yhat
+    The forecast frames from predict are cached, so get_pred_values never re-predicts
+    """
+    
+    def __init__(self, regressors={}, pred_periods=96, daily_seasonality=True,
+                 seasonalities=(('summer', 96, 5), ('workweek', 5, 5)),
+                 seasonality_mode='multiplicative', uncertainty_samples=1000,
+                 point_forecast_only=False):
+        self.pred_periods=pred_periods
+        self.regressors=regressors
+        self.daily_seasonality=daily_seasonality
+        self.seasonalities=seasonalities
+        self.seasonality_mode=seasonality_mode
+        self.uncertainty_samples=uncertainty_samples
+        self.point_forecast_only=point_forecast_only
+       
+        
+    def prep_X(self, X):
+        # Prophet requires a DataFrame with a column of dates labeled 'ds'
+        if 'ds' not in X.columns:
+            X = X.assign(ds = X.index)
+            X.reset_index(drop=True, inplace=True)
+        return X
+    
+    def prep_y(self, y):
+        # prohet requires the target to be labeled as y
+        if y.name != 'y':
+            y.name = 'y'
+        return y
+
+    def build_model(self):
+        Prophet = _prophet_class()
+
+        # Without uncertainty samples Prophet.predict skips the sampling altogether
+        uncertainty_samples = 0 if self.point_forecast_only else self.uncertainty_samples
+        model = Prophet(daily_seasonality=self.daily_seasonality,
+                        uncertainty_samples=uncertainty_samples)
+        for name, period, fourier_order in self.seasonalities:
+            model.add_seasonality(name=name, period=period, fourier_order=fourier_order)
+        # Set after the custom seasonalities are added, so as before, only the
+        # built-in seasonalities and the regressors pick up the mode
+        model.seasonality_mode = self.seasonality_mode
+
+        for regressor, params in self.regressors.items():
+            if not params:
+                model.add_regressor(regressor)
+            elif len(params) == 2:
+                model.add_regressor(regressor, prior_scale=params[0], mode=params[1])
+            else:
+                model.add_regressor(regressor, prior_scale=params[0], standardize=params[1],
+                                    mode=params[2])
+        return model
+        
+    def fit(self, X, y):
+        self.X_fit = X.copy(deep=True)
+        self.y_fit = y.copy(deep=True)
+        self.fit_forecast_ = None
+        self.pred_forecast_ = None
+        
+        # Setup the model
+        self.model = self.build_model()
+        
+        # Setup the data
+        X = self.prep_X(X)
+        y = self.prep_y(y)       
+        df = X.merge(right=y, left_on='ds', right_on=y.index)
+        
+        self.model.fit(df)
+        return self.model
+
+    def forecast(self, X):
+        """
+        Returns Prophet's forecast frame for X
+        In point_forecast_only mode the model has no uncertainty samples, and the interval
+        columns Prophet leaves out are added back as NaN, so both modes return the same columns
+        """
+        X_ = self.prep_X(X)
+        if not self.point_forecast_only:
+            return self.model.predict(X_)
+
+        if _prophet_version(self.model) >= (0, 6):
+            forecast_object = self.model.predict(X_)
+        else:
+            # Prophet before 0.6 always samples in predict, so run its steps without that one
+            df = self.model.setup_dataframe(X_.copy())
+            df['trend'] = self.model.predict_trend(df)
+            seasonal_components = self.model.predict_seasonal_components(df)
+            forecast_object = pd.concat((df[['ds', 'trend']], seasonal_components), axis=1)
+            forecast_object['yhat'] = (forecast_object['trend']
+                                       * (1 + forecast_object['multiplicative_terms'])
+                                       + forecast_object['additive_terms'])
+        return _with_interval_columns(forecast_object)
+        
+    def predict(self, X):
+        self.X_pred = X.copy(deep=True)
+        forecast_object = self.forecast(self.X_pred)
+        # Cache the forecast, so get_pred_values can re-use it
+        self.pred_forecast_ = forecast_object
+        if self.X_pred.index.equals(self.X_fit.index):
+            self.fit_forecast_ = forecast_object
+        # When we return the prediction, we are looking to return a datetime indexed series
+        # Therefore, we need to reverse what was done in prep_X prior to returning
+        preds = forecast_object.set_index('ds', drop=True)
+        preds = preds['yhat']
+        preds.index.names=['date']
+        return preds
+    
+    def get_pred_values(self):
+        # All Data is only available after fit and predict
+        # Build a return DataFrame that looks similar to the prophet output
+        # date index y | yhat| yhat_lower | yhat_upper | is_forecast
+        if self.fit_forecast_ is None:
+            self.fit_forecast_ = self.forecast(self.X_fit)
+        forecast_obj = pd.concat([self.fit_forecast_, self.pred_forecast_],
+                                 axis=0, sort=False).reset_index(drop=True)
+        forecast_obj['is_forecast'] = 0
+        forecast_obj.set_index('ds',drop=True, inplace=True)
+        forecast_obj.index.name = None
+        forecast_obj.loc[self.y_fit.index, 'y'] = self.y_fit.values
+        forecast_obj.loc[self.X_pred.index, 'is_forecast'] = 1
+        
+        return forecast_obj
+
+
+class SK_Prophet_1(SK_Prophet):
+    """ SK_Prophet with no daily or custom seasonality, and additive seasonality mode
+    Regressors are usually given as (prior_scale, standardize, mode)
+    """
+    
+    def __init__(self, regressors={}, pred_periods=96, daily_seasonality=False,
+                 seasonalities=(), seasonality_mode='additive', uncertainty_samples=1000,
+                 point_forecast_only=False):
+        super().__init__(regressors=regressors,
+                         pred_periods=pred_periods,
+                         daily_seasonality=daily_seasonality,
+                         seasonalities=seasonalities,
+                         seasonality_mode=seasonality_mode,
+                         uncertainty_samples=uncertainty_samples,
+                         point_forecast_only=point_forecast_only)
+
+
+def _pred_values_frame(y_fit, fit_yhat, pred_yhat):
+    """
+    Builds the get_pred_values DataFrame of a combined model
+    date index | y | yhat | yhat_lower | yhat_upper | is_forecast
+    The combined models have no intervals, so yhat_lower and yhat_upper are NaN
+    """
+    fitted = pd.DataFrame({"y": y_fit.values, "yhat": np.asarray(fit_yhat), "is_forecast": 0},
+                          index=y_fit.index)
+    predicted = pd.DataFrame({"y": np.nan, "yhat": np.asarray(pred_yhat), "is_forecast": 1},
+                             index=pred_yhat.index)
+    full_suite = pd.concat([fitted, predicted], axis=0, sort=False)
+    full_suite = full_suite[~full_suite.index.duplicated(keep="last")]
+    full_suite["yhat_lower"] = np.nan
+    full_suite["yhat_upper"] = np.nan
+    return full_suite[["y", "yhat", "yhat_lower", "yhat_upper", "is_forecast"]]
+
+
+class BaseFitMemo:
+    """ An in-memory memo of fitted base models, shared by the ResidualStackRegressors given it
+    Entries are keyed by the fingerprints of X and y and the base model's parameters, and
+    hold a fitted base model with its in-sample predictions. Every stack gets its own deep
+    copy of the memoised model, so refitting or changing one stack's base_model_ never
+    reaches another stack, or the memo
+    Copies of the memo, e.g. made by sklearn's clone in run_cross_val, are the memo itself,
+    so cloned stacks keep sharing it. A pickled memo, e.g. sent to a worker process or saved
+    with a model, is unpickled empty
+    max_entries: the number of base fits kept, least recently used dropped first
+    """
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __getstate__(self):
+        return {"max_entries": self.max_entries}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Returns a copy of the (fitted base model, in-sample predictions) of key, None on a miss
+        """
+        if key not in self._entries:
+            return None
+        self._entries.move_to_end(key)
+        base_model, base_yhat = self._entries[key]
+        return copy.deepcopy(base_model), base_yhat.copy()
+
+    def put(self, key, base_model, base_yhat):
+        """
+        Keeps a copy of a fitted base model and its in-sample predictions under key
+        """
+        self._entries[key] = (copy.deepcopy(base_model), np.array(base_yhat, copy=True))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class ResidualStackRegressor(BaseEstimator, RegressorMixin):
+    """ A time series model plus a model of its residuals, as in notebooks 07.04 - 07.16
+    base_model (SK_SARIMAX, SK_Prophet, ...) is fitted on X, y and predicts y_hat.
+    residual_model is fitted on X and the residuals y - y_hat, and the prediction is
+    y_hat + r_hat
+
+    base_memo: an optional BaseFitMemo. Stacks given the same memo fit a shared base model
+    configuration once per fold, however many residual models are tried
+    """
+
+    def __init__(self, base_model=None, residual_model=None, base_memo=None):
+        self.base_model = base_model
+        self.residual_model = residual_model
+        self.base_memo = base_memo
+
+    def _fit_base(self, X, y):
+        """
+        Returns a fitted base model and its predictions on X, from base_memo if possible
+        """
+        from sklearn.base import clone
+
+        from src.utils.cache import fingerprint_frame, params_token
+
+        key = None
+        if self.base_memo is not None:
+            key = (fingerprint_frame(X), fingerprint_frame(y), params_token(self.base_model))
+            entry = self.base_memo.get(key)
+            if entry is not None:
+                return entry
+
+        base_model = clone(self.base_model, safe=False)
+        base_model.fit(X, y)
+        base_yhat = np.asarray(base_model.predict(X))
+        if key is not None:
+            self.base_memo.put(key, base_model, base_yhat)
+        return base_model, base_yhat
+
+    def fit(self, X, y):
+        from sklearn.base import clone
+
+        self.X_fit = X
+        self.y_fit = y
+        self.base_model_, base_yhat = self._fit_base(X, y)
+        self._base_preds = {}
+        self.base_yhat_ = pd.Series(np.asarray(base_yhat), index=y.index)
+        self.resid_ = y - self.base_yhat_
+
+        self.residual_model_ = clone(self.residual_model)
+        self.residual_model_.fit(X, self.resid_)
+        self.fit_yhat_ = self.base_yhat_ + self.residual_model_.predict(X)
+        self.pred_yhat_ = None
+        return self
+
+    def predict(self, X):
+        if X.index.equals(self.X_fit.index) and X.equals(self.X_fit):
+            # The base and residual predictions on the fit data are already known
+            yhat = self.fit_yhat_
+        else:
+            from src.utils.cache import fingerprint_frame
+
+            key = fingerprint_frame(X)
+            if key not in self._base_preds:
+                self._base_preds[key] = np.asarray(self.base_model_.predict(X))
+            yhat = pd.Series(self._base_preds[key] + self.residual_model_.predict(X),
+                             index=X.index)
+        self.pred_yhat_ = yhat
+        return yhat
+
+    def get_pred_values(self):
+        # All Data is only available after fit and predict
+        return _pred_values_frame(self.y_fit, self.fit_yhat_, self.pred_yhat_)
+
+
+class AveragingRegressor(BaseEstimator, RegressorMixin):
+    """ Averages the predictions of several models, e.g. two ResidualStackRegressors,
+    as in the averaging model of notebook 07.17
+    weights: optional weight per estimator, an unweighted mean by default
+    """
+
+    def __init__(self, estimators=(), weights=None):
+        self.estimators = estimators
+        self.weights = weights
+
+    def _average(self, predictions, index):
+        return pd.Series(np.average(np.column_stack([np.asarray(pred) for pred in predictions]),
+                                    axis=1, weights=self.weights), index=index)
+
+    def fit(self, X, y):
+        from sklearn.base import clone
+
+        self.X_fit = X
+        self.y_fit = y
+        self.estimators_ = []
+        fit_yhats = []
+        for estimator in self.estimators:
+            estimator = clone(estimator, safe=False)
+            estimator.fit(X, y)
+            self.estimators_.append(estimator)
+            # Residual stacks already know their in-sample predictions
+            fit_yhats.append(estimator.fit_yhat_ if hasattr(estimator, "fit_yhat_")
+                             else estimator.predict(X))
+        self.fit_yhat_ = self._average(fit_yhats, y.index)
+        self.pred_yhat_ = None
+        return self
+
+    def predict(self, X):
+        self.pred_yhat_ = self._average([estimator.predict(X) for estimator in self.estimators_],
+                                        X.index)
+        return self.pred_yhat_
+
+    def get_pred_values(self):
+        # All Data is only available after fit and predict
+        return _pred_values_frame(self.y_fit, self.fit_yhat_, self.pred_yhat_)
+
@@ -0,0 +1,217 @@
+import collections
+import collections.abc
+import datetime
+import json
+import os
+import pathlib
+import pickle
+import sys
+
+from src.utils.cache import fingerprint_frame
+
+
+# Bump when the on-disk layout of an entry changes
+REGISTRY_VERSION = 1
+
+VERSIONED_PACKAGES = ['numpy', 'pandas', 'sklearn', 'statsmodels', 'fbprophet', 'xgboost']
+
+
+def _package_versions():
+    # Only report packages that are already imported, i.e. the ones the model was built with.
+    # This keeps saving cheap, and avoids importing Prophet just to read its version
+    versions = {}
+    for package in VERSIONED_PACKAGES:
+        module = sys.modules.get(package)
+        if module is not None:
+            versions[package] = getattr(module, '__version__', None)
+    return versions
+
+
+class ModelRegistry:
+    """
+    A local directory of fitted model wrappers, ready to predict without refitting
+    Each entry lives in <registry_dir>/<name>/ or <registry_dir>/<name>/group=<group>/
+    for per-group models such as the day of week models from temporal_split, as
+    model.pkl alongside a metadata.json holding the training data fingerprint,
+    feature list, library versions and creation time
+    A per-group entry also pickles its group key to group.pkl, so load_groups returns the
+    keys it was given, e.g. the float day of week keys of temporal_split, not their names
+    Metadata is read without unpickling any model. Models are unpickled on first load,
+    and at most max_resident are kept in memory, least recently used dropped first
+    """
+
+    model_file = 'model.pkl'
+    metadata_file = 'metadata.json'
+    group_file = 'group.pkl'
+
+    def __init__(self, registry_dir, max_resident=16):
+        self.registry_dir = pathlib.Path(registry_dir)
+        self.max_resident = max_resident
+        self.registry_dir.mkdir(parents=True, exist_ok=True)
+        self._resident = collections.OrderedDict()
+
+    def _entry_dir(self, name, group=None):
+        entry_dir = self.registry_dir / name
+        if group is not None:
+            entry_dir = entry_dir / f'group={group}'
+        return entry_dir
+
+    @staticmethod
+    def _write_atomic(path, data: bytes):
+        tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def save(self, name, model, X=None, y=None, group=None, metadata=None):
+        """
+        Serialises a fitted model wrapper
+        X and y are the training data, used for the fingerprint and feature list.
+        When not given, the wrapper's own copy of its fit data is used if it has one
+        metadata is an optional dict of extra, json serialisable values
+        Returns the metadata dict that was written
+        """
+        if X is None:
+            X = getattr(model, 'X_fit', getattr(model, 'fit_X', None))
+        if y is None:
+            y = getattr(model, 'y_fit', getattr(model, 'fit_y', None))
+
+        entry_metadata = {
+            'name': name,
+            'group': None if group is None else str(group),
+            'model_class': f'{type(model).__module__}.{type(model).__qualname__}',
+            'features': None if X is None else [str(col) for col in X.columns],
+            'X_fingerprint': None if X is None else fingerprint_frame(X),
+            'y_fingerprint': None if y is None else fingerprint_frame(y),
+            'train_start': None if X is None or len(X) == 0 else str(X.index[0]),
+            'train_end': None if X is None or len(X) == 0 else str(X.index[-1]),
+            'package_versions': _package_versions(),
+            'python_version': sys.version.split()[0],
+            'registry_version': REGISTRY_VERSION,
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        }
+        entry_metadata.update(metadata or {})
+
+        entry_dir = self._entry_dir(name, group)
+        if group is not None and (entry_dir / self.group_file).exists():
+            stored = self._stored_group(entry_dir)
+            if stored != group:
+                raise ValueError(f"group {group!r} of '{name}' would overwrite group {stored!r}, "
+                                 "which has the same name")
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        if group is not None:
+            self._write_atomic(entry_dir / self.group_file,
+                               pickle.dumps(group, protocol=pickle.HIGHEST_PROTOCOL))
+        self._write_atomic(entry_dir / self.model_file,
+                           pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+        self._write_atomic(entry_dir / self.metadata_file,
+                           json.dumps(entry_metadata, indent=2, default=str).encode())
+
+        self._resident.pop((name, None if group is None else str(group)), None)
+        return entry_metadata
+
+    def _stored_group(self, entry_dir):
+        """
+        Returns the group key saved in a group directory, None if there is none
+        """
+        path = entry_dir / self.group_file
+        if path.exists():
+            return pickle.loads(path.read_bytes())
+        return None
+
+    def save_groups(self, name, models, X_splits=None, y_splits=None, metadata=None):
+        """
+        Saves a dict of {group: model}, e.g. one model per day of week
+        X_splits and y_splits are optional dicts of the training data, keyed the same way
+        """
+        for group, model in models.items():
+            X = None if X_splits is None else X_splits[group]
+            y = None if y_splits is None else y_splits[group]
+            self.save(name, model, X=X, y=y, group=group, metadata=metadata)
+
+    def metadata(self, name, group=None):
+        """
+        Returns the metadata dict of an entry, without loading the model
+        """
+        with open(self._entry_dir(name, group) / self.metadata_file) as f:
+            return json.load(f)
+
+    def load(self, name, group=None, X=None):
+        """
+        Returns the fitted model wrapper, ready for predict
+        If X is given, its columns are checked against the features the model was trained on
+        """
+        if X is not None:
+            features = self.metadata(name, group)['features']
+            if features is not None and [str(col) for col in X.columns] != features:
+                raise ValueError(f"X columns do not match the features '{name}' was trained on")
+
+        key = (name, None if group is None else str(group))
+        if key in self._resident:
+            self._resident.move_to_end(key)
+            return self._resident[key]
+
+        with open(self._entry_dir(name, group) / self.model_file, 'rb') as f:
+            model = pickle.load(f)
+
+        self._resident[key] = model
+        while len(self._resident) > self.max_resident:
+            self._resident.popitem(last=False)
+        return model
+
+    def load_groups(self, name):
+        """
+        Returns a lazily loading dict-like {group: model} view of a per-group entry
+        """
+        return _GroupView(self, name)
+
+    def entries(self):
+        """
+        Returns a list of the metadata dicts of every entry
+        """
+        return [json.loads(path.read_text())
+                for path in sorted(self.registry_dir.rglob(self.metadata_file))]
+
+    def delete(self, name, group=None):
+        """
+        Removes an entry, or every group of a per-group entry
+        """
+        entry_dir = self._entry_dir(name, group)
+        for path in sorted(entry_dir.rglob('*'), reverse=True):
+            if path.is_dir():
+                path.rmdir()
+            else:
+                path.unlink()
+        entry_dir.rmdir()
+        for key in list(self._resident):
+            if key[0] == name and (group is None or key[1] == str(group)):
+                del self._resident[key]
+
+
+class _GroupView(collections.abc.Mapping):
+    # Groups are listed from their group.pkl keys. Models are only unpickled when accessed
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def _groups(self):
+        entry_dir = self.registry._entry_dir(self.name)
+        groups = [self.registry._stored_group(path) for path in entry_dir.glob('group=*')]
+        groups = [group for group in groups if group is not None]
+        try:
+            return sorted(groups)
+        except TypeError:
+            return sorted(groups, key=str)
+
+    def __getitem__(self, group):
+        for stored in self._groups():
+            if stored == group:
+                return self.registry.load(self.name, stored)
+        raise KeyError(group)
+
+    def __iter__(self):
+        return iter(self._groups())
+
+    def __len__(self):
+        return len(self._groups())
@@ -0,0 +1,120 @@
+import inspect
+
+import numpy as np
+import pandas as pd
+
+from src.models.estimators import STATSMODELS_UPDATES, _statsmodels_version
+
+
+class StreamingSARIMAX:
+    """ Daily peak forecasts from a fitted SK_SARIMAX, updated as observations arrive
+    Observations must arrive at the frequency the model was fitted at, one row per step.
+    The SK_SARIMAX of the modelling notebooks is fitted on daily summer peaks, so each
+    update is one day's peak and each day is one forecast step. A model fitted on hourly
+    demand is updated hour by hour instead, and then forecasts each day's remaining hours
+    update assimilates new observations with a Kalman filter step from the last filtered
+    state (statsmodels' results.extend), so each update costs the same however long the
+    history is, and the parameters stay those of the fit. The state after any number of
+    updates is the one a full refilter over the fit data plus the updates would reach
+    peak_forecast returns each day's peak forecast: the larger of the peak observed so far
+    and the largest forecast of the day's remaining steps. When a day has one forecast step
+    its interval is that step's forecast interval. The daily maximum of several steps'
+    interval bounds is not an interval for the peak, so for days with more than one step
+    n_paths sample paths are simulated from the last filtered state (results.simulate),
+    and the interval is taken from the quantiles of each path's daily peak
+    SK_Prophet needs no streaming counterpart: its forecasts depend on time and exog only,
+    not on the latest observations
+    results.extend, and simulate's anchor and repetitions, need statsmodels 0.11 or later,
+    so with an older statsmodels the constructor raises an ImportError; refit the SK_SARIMAX
+    on the longer history instead
+
+    model: a fitted SK_SARIMAX, left unchanged
+    alpha: the interval's significance level, as in SK_SARIMAX's conf_int
+    n_paths: the number of sample paths simulated for the peak intervals
+    seed: an optional seed for the simulated paths
+    """
+
+    def __init__(self, model, alpha=0.05, n_paths=1000, seed=None):
+        if _statsmodels_version() < STATSMODELS_UPDATES:
+            raise ImportError("StreamingSARIMAX needs statsmodels "
+                              + ".".join(map(str, STATSMODELS_UPDATES)) + " or later")
+        self.model = model
+        self.alpha = alpha
+        self.n_paths = n_paths
+        self.random_state = np.random.RandomState(seed)
+        self.results = model.results
+        # Rows since the start of the fit data, which the Fourier terms are counted from
+        self.n_obs = len(model.fit_y)
+        self.last_time = model.fit_y.index[-1]
+        self.observed_peaks = {}
+        self._record(model.fit_y[model.fit_y.index.normalize() == self.last_time.normalize()])
+
+    def _record(self, y):
+        # Only the running maximum of each day is kept, not the observations
+        for day, peak in y.groupby(y.index.normalize()).max().items():
+            self.observed_peaks[day] = max(peak, self.observed_peaks.get(day, -np.inf))
+
+    def update(self, X, y, X_ahead=None):
+        """
+        Accepts the exog X and demand y of the hours since the last update, in order
+        Returns peak_forecast(X_ahead) when X_ahead is given
+        """
+        if len(y):
+            if y.index[0] <= self.last_time:
+                raise ValueError(f"observations must follow {self.last_time}, got {y.index[0]}")
+            self.results = self.results.extend(y, exog=self.model._exog(X, self.n_obs))
+            self.n_obs += len(y)
+            self.last_time = y.index[-1]
+            self._record(y)
+        if X_ahead is not None:
+            return self.peak_forecast(X_ahead)
+        return None
+
+    def hourly_forecast(self, X_ahead):
+        """
+        Accepts the exog of the steps following the last observation
+        Returns their yhat, yhat_lower and yhat_upper
+        """
+        forecast = self.results.get_forecast(steps=len(X_ahead),
+                                             exog=self.model._exog(X_ahead, self.n_obs))
+        hourly = pd.DataFrame(forecast.conf_int(alpha=self.alpha).values,
+                              index=X_ahead.index, columns=["yhat_lower", "yhat_upper"])
+        hourly.insert(0, "yhat", np.asarray(forecast.predicted_mean))
+        return hourly
+
+    def simulate(self, X_ahead):
+        """
+        Accepts the exog of the steps following the last observation
+        Returns an array of n_paths sample paths, one row per step
+        """
+        # statsmodels 0.15 renamed simulate's random_state argument to rng
+        parameters = inspect.signature(self.results.simulate).parameters
+        seed_arg = "rng" if "rng" in parameters else "random_state"
+        paths = self.results.simulate(len(X_ahead), anchor="end", repetitions=self.n_paths,
+                                      exog=self.model._exog(X_ahead, self.n_obs),
+                                      **{seed_arg: self.random_state})
+        return np.asarray(paths).reshape(len(X_ahead), self.n_paths)
+
+    def peak_forecast(self, X_ahead):
+        """
+        Accepts the exog of the steps following the last observation, e.g. up to the end of today
+        Returns a DataFrame indexed by day of: y (the peak observed so far, NaN if none),
+        yhat, yhat_lower and yhat_upper of the day's peak, and n_forecast (the steps still
+        forecast)
+        """
+        hourly = self.hourly_forecast(X_ahead)
+        day_index = hourly.index.normalize()
+        days = hourly.groupby(day_index)
+        peaks = days.max()
+        peaks["n_forecast"] = days.size()
+        peaks.insert(0, "y", [self.observed_peaks.get(day, np.nan) for day in peaks.index])
+
+        if (peaks["n_forecast"] > 1).any():
+            paths = pd.DataFrame(self.simulate(X_ahead), index=hourly.index)
+            path_peaks = paths.groupby(day_index).max().values
+            path_peaks = np.fmax(path_peaks, peaks[["y"]].values)
+            peaks["yhat_lower"] = np.percentile(path_peaks, 100 * self.alpha / 2, axis=1)
+            peaks["yhat_upper"] = np.percentile(path_peaks, 100 * (1 - self.alpha / 2), axis=1)
+        for column in ("yhat", "yhat_lower", "yhat_upper"):
+            peaks[column] = np.fmax(peaks[column], peaks["y"])
+        return peaks
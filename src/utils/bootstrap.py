@@ -0,0 +1,107 @@
+from concurrent.futures import ProcessPoolExecutor
+from math import factorial
+
+import numpy as np
+import pandas as pd
+
+from src.utils.utils import resolve_n_jobs
+
+
+def hit_matrix(bound_precisions, attempts=5):
+    """
+    Accepts the bound precision achieved in each year, e.g. the test scores from
+    run_cross_val or the held out test results, and the number of attempts per year
+    Returns a (years, attempts) array of 1s for correctly predicted peaks and 0s for misses
+    """
+    bound_precisions = np.asarray(bound_precisions, dtype=float)
+    n_hits = np.rint(bound_precisions * attempts).astype(int)
+    return (np.arange(attempts)[np.newaxis, :] < n_hits[:, np.newaxis]).astype(np.int8)
+
+
+def _simulate_chunk(pooled, attempts, n_trials, seed):
+    """
+    Simulates n_trials years by drawing attempts outcomes with replacement from the pooled outcomes
+    Returns the number of simulated years with 0, 1, ... attempts hits
+    """
+    rng = np.random.RandomState(seed)
+    draws = rng.randint(0, len(pooled), size=(n_trials, attempts))
+    year_hits = pooled[draws].sum(axis=1)
+    return np.bincount(year_hits, minlength=attempts + 1)
+
+
+def simulate_hit_counts(hits, n_trials=1000000, chunk_size=100000, seed=None, n_jobs=None):
+    """
+    Accepts a hit matrix from hit_matrix
+    Pools every year's outcomes, and simulates n_trials years of attempts guesses each,
+    resampling the pooled outcomes with replacement
+    The trials run in chunks of chunk_size, so memory is bounded whatever n_trials is.
+    Each chunk has its own seed drawn from seed, so results are reproducible for a given
+    seed and chunk_size, whether the chunks run in one process or over n_jobs processes
+    (as joblib, -1 for all cores)
+    Returns an array of the number of simulated years with 0, 1, ... attempts hits
+    """
+    hits = np.asarray(hits)
+    attempts = hits.shape[1]
+    pooled = hits.ravel()
+
+    chunk_sizes = [chunk_size] * (n_trials // chunk_size)
+    if n_trials % chunk_size:
+        chunk_sizes.append(n_trials % chunk_size)
+    chunk_seeds = np.random.RandomState(seed).randint(0, 2 ** 31 - 1, size=len(chunk_sizes))
+
+    max_workers = resolve_n_jobs(n_jobs)
+    if max_workers == 1:
+        counts = [_simulate_chunk(pooled, attempts, size, chunk_seed)
+                  for size, chunk_seed in zip(chunk_sizes, chunk_seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            counts = list(pool.map(_simulate_chunk,
+                                   [pooled] * len(chunk_sizes),
+                                   [attempts] * len(chunk_sizes),
+                                   chunk_sizes,
+                                   chunk_seeds))
+
+    return np.sum(counts, axis=0)
+
+
+def _binomial_pmf(p, attempts):
+    # p is a 1-D array of hit rates. Returns a (len(p), attempts + 1) array of probabilities
+    k = np.arange(attempts + 1)
+    combinations = np.array([factorial(attempts) // (factorial(i) * factorial(attempts - i))
+                             for i in k])
+    p = np.asarray(p, dtype=float)[:, np.newaxis]
+    return combinations * p ** k * (1 - p) ** (attempts - k)
+
+
+def hit_count_distribution(hits, n_trials=1000000, confidence=0.95, n_boot=10000,
+                           chunk_size=100000, seed=None, n_jobs=None):
+    """
+    Accepts a hit matrix from hit_matrix
+    Estimates the probability of getting k out of attempts peaks correct in a year,
+    for k = 0 ... attempts, with simulate_hit_counts
+    The confidence interval of each probability reflects how few years the hit matrix holds:
+    the years are resampled n_boot times, and for each resample the probability of k hits
+    is taken at that resample's hit rate
+    Returns a DataFrame indexed by k, with the proportion correct, the simulated probability,
+    and the lower and upper confidence bounds
+    """
+    hits = np.asarray(hits)
+    n_years, attempts = hits.shape
+
+    counts = simulate_hit_counts(hits, n_trials=n_trials, chunk_size=chunk_size,
+                                 seed=seed, n_jobs=n_jobs)
+
+    rng = np.random.RandomState(seed)
+    year_hits = hits.sum(axis=1)
+    resampled_years = rng.randint(0, n_years, size=(n_boot, n_years))
+    boot_rates = year_hits[resampled_years].sum(axis=1) / (n_years * attempts)
+    boot_pmf = _binomial_pmf(boot_rates, attempts)
+
+    tail = (1 - confidence) / 2 * 100
+    lower, upper = np.percentile(boot_pmf, [tail, 100 - tail], axis=0)
+
+    return pd.DataFrame({'proportion': np.arange(attempts + 1) / attempts,
+                         'probability': counts / counts.sum(),
+                         'lower': lower,
+                         'upper': upper},
+                        index=pd.RangeIndex(attempts + 1, name='hits'))
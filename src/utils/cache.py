@@ -0,0 +1,174 @@
+import hashlib
+import inspect
+import os
+import pickle
+import pathlib
+
+import numpy as np
+import pandas as pd
+
+
+# Bump when the layout of a cached entry changes, so stale entries are never read back
+CACHE_VERSION = 1
+
+
+def fingerprint_frame(data) -> str:
+    """
+    Accepts a pandas DataFrame or Series
+    Hashes the values, the index, the column names and the dtypes
+    Returns a hex digest that changes if any of these change
+    """
+    hasher = hashlib.sha256()
+    hasher.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+    if isinstance(data, pd.DataFrame):
+        hasher.update(repr(list(data.columns)).encode())
+        hasher.update(repr(list(data.dtypes.astype(str))).encode())
+    else:
+        hasher.update(repr(data.name).encode())
+        hasher.update(str(data.dtype).encode())
+    return hasher.hexdigest()
+
+
+def params_token(obj):
+    """
+    Builds a deterministic, hashable description of an estimator, splitter or parameter value
+    Estimators are described through get_params(deep=False), other objects through
+    the attributes named in their __init__ signature, so memory addresses never leak in
+    """
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return ("frame", fingerprint_frame(obj))
+    if isinstance(obj, np.ndarray):
+        return ("ndarray", str(obj.dtype), obj.shape, hashlib.sha256(obj.tobytes()).hexdigest())
+    if isinstance(obj, dict):
+        return tuple(sorted((repr(key), params_token(value)) for key, value in obj.items()))
+    if isinstance(obj, (list, tuple)):
+        return tuple(params_token(value) for value in obj)
+    if obj is None or isinstance(obj, (str, bytes, bool, int, float, np.generic)):
+        return repr(obj)
+    if isinstance(obj, type) or inspect.isfunction(obj) or inspect.isbuiltin(obj):
+        return (getattr(obj, "__module__", None), getattr(obj, "__qualname__", repr(obj)))
+
+    cls = type(obj)
+    if hasattr(obj, "get_params"):
+        params = obj.get_params(deep=False)
+    else:
+        init_params = inspect.signature(cls.__init__).parameters.values()
+        params = {
+            param.name: getattr(obj, param.name, None)
+            for param in init_params
+            if param.name != "self" and param.kind not in (param.VAR_POSITIONAL, param.VAR_KEYWORD)
+        }
+    return (cls.__module__, cls.__qualname__, params_token(params))
+
+
+class FoldCache:
+    """
+    A content-addressed on-disk cache of cross validation fold predictions
+    Entries are keyed by the fingerprint of the fold's X/y slices, the splitter and the
+    pipeline parameters, and hold the train and test predictions, not the scores.
+    Metrics are recomputed from the stored predictions, so adding a metric costs no refits
+    When the cache grows past max_bytes, the least recently used entries are evicted
+    """
+
+    suffix = ".pkl"
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 ** 2):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def fold_key(self, X_train, y_train, X_test, y_test, cv_splitter, pipeline) -> str:
+        """
+        Returns the cache key for a single fold
+        """
+        hasher = hashlib.sha256()
+        for part in (
+            CACHE_VERSION,
+            fingerprint_frame(X_train),
+            fingerprint_frame(y_train),
+            fingerprint_frame(X_test),
+            fingerprint_frame(y_test),
+            params_token(cv_splitter),
+            params_token(pipeline),
+        ):
+            hasher.update(repr(part).encode())
+        return hasher.hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / (key + self.suffix)
+
+    def get(self, key):
+        """
+        Returns the stored (y_train_pred, y_test_pred) tuple, or None on a miss
+        A hit refreshes the entry's position in the eviction order
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                preds = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        os.utime(path)
+        return preds
+
+    def put(self, key, y_train_pred, y_test_pred):
+        """
+        Stores the predictions for a fold, then evicts down to max_bytes
+        The entry is written to a temporary file and renamed, so concurrent
+        writers and readers never see a partial entry
+        """
+        path = self._path(key)
+        tmp_path = path.with_suffix(".{}.tmp".format(os.getpid()))
+        with open(tmp_path, "wb") as f:
+            pickle.dump((y_train_pred, y_test_pred), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def invalidate(self, key=None):
+        """
+        Removes a single entry, or every entry when key is None
+        Returns the number of entries removed
+        """
+        paths = [self._path(key)] if key is not None else self._entries()
+        removed = 0
+        for path in paths:
+            try:
+                path.unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def size(self) -> int:
+        """
+        Returns the total size of the cached entries in bytes
+        """
+        return sum(path.stat().st_size for path in self._entries())
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache fits in max_bytes
+        """
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def _entries(self):
+        return list(self.cache_dir.glob("*" + self.suffix))
+
+    def __len__(self):
+        return len(self._entries())
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+
+# Headless counterpart of residual_plots and print_residual_stats in src.visualization.
+# Every statistic is computed for all residual series at once on a NaN padded matrix,
+# and nothing here imports a plotting library
+
+
+def residuals(pred_values, goback_years=1):
+    """
+    Accepts a get_pred_values DataFrame, with or without a resid column
+    Keeps the final goback_years years, as print_residual_stats does (None keeps every year)
+    Returns the residuals y - yhat, without the rows where either is missing
+    """
+    if goback_years is not None:
+        final_year = pred_values.index.year.unique()[-1]
+        start_year = final_year - goback_years + 1
+        pred_values = pred_values.loc[str(start_year): str(final_year)]
+    if 'resid' in pred_values.columns:
+        resids = pred_values['resid']
+    else:
+        resids = pred_values['y'].subtract(pred_values['yhat'])
+    return resids.dropna()
+
+
+def residual_matrix(pred_values, goback_years=1):
+    """
+    Accepts a dict of {name: get_pred_values DataFrame}, e.g. keyed by (model, fold)
+    Returns the names, a (series, max length) array of residuals padded with NaN,
+    and the length of each series
+    """
+    names = list(pred_values)
+    series = [residuals(pred_values[name], goback_years).values for name in names]
+    lengths = np.array([len(resids) for resids in series])
+    matrix = np.full((len(series), lengths.max() if len(series) else 0), np.nan)
+    for row, resids in enumerate(series):
+        matrix[row, :len(resids)] = resids
+    return names, matrix, lengths
+
+
+def batch_acf(matrix, lengths, nlags=10):
+    """
+    Accepts a NaN padded residual matrix and the length of each row
+    Returns a (series, nlags + 1) array of autocorrelations from lag 0,
+    computed with one FFT over every row, as statsmodels acf(fft=True)
+    """
+    demeaned = matrix - np.nanmean(matrix, axis=1, keepdims=True)
+    demeaned = np.where(np.isnan(demeaned), 0.0, demeaned)
+    n_fft = 1 << int(2 * matrix.shape[1] - 1).bit_length()
+    spectrum = np.fft.rfft(demeaned, n=n_fft, axis=1)
+    autocovariance = np.fft.irfft(spectrum * np.conj(spectrum), n=n_fft, axis=1)[:, :nlags + 1]
+    acf = autocovariance / autocovariance[:, :1]
+    # Lags at or beyond a series' length are undefined
+    acf[np.arange(nlags + 1)[np.newaxis, :] >= lengths[:, np.newaxis]] = np.nan
+    return acf
+
+
+def ljung_box(acf, lengths, lags=10):
+    """
+    Accepts the output of batch_acf and the length of each series
+    Returns the Ljung-Box statistics and p-values for lags 1 ... lags, each (series, lags)
+    """
+    from scipy.stats import chi2
+
+    lag = np.arange(1, lags + 1)[np.newaxis, :]
+    n = lengths[:, np.newaxis].astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        q_stats = n * (n + 2) * np.cumsum(acf[:, 1:lags + 1] ** 2 / (n - lag), axis=1)
+    return q_stats, chi2.sf(q_stats, lag)
+
+
+def jarque_bera(matrix, lengths):
+    """
+    Accepts a NaN padded residual matrix and the length of each row
+    Returns the Jarque-Bera statistics, p-values, skews and kurtoses of every row
+    """
+    from scipy.stats import chi2
+
+    centred = matrix - np.nanmean(matrix, axis=1, keepdims=True)
+    m2 = np.nanmean(centred ** 2, axis=1)
+    skew = np.nanmean(centred ** 3, axis=1) / m2 ** 1.5
+    kurtosis = np.nanmean(centred ** 4, axis=1) / m2 ** 2
+    jb_stats = lengths / 6 * (skew ** 2 + (kurtosis - 3) ** 2 / 4)
+    return jb_stats, chi2.sf(jb_stats, 2), skew, kurtosis
+
+
+def residual_diagnostics(pred_values, goback_years=1, lags=10):
+    """
+    Accepts a dict of {name: get_pred_values DataFrame}, e.g. keyed by (model, fold)
+    Returns a DataFrame with one row per name of:
+    n, bias (mean residual), bias_t (its t statistic), mae, rmse, std, skew, kurtosis,
+    jb_stat and jb_pvalue (Jarque-Bera), lb_stat (Ljung-Box at lag lags), lb_pvalue
+    (the largest p-value over lags 1 ... lags, as print_residual_stats reports), and acf_1 ...
+    """
+    names, matrix, lengths = residual_matrix(pred_values, goback_years)
+
+    bias = np.nanmean(matrix, axis=1)
+    std = np.nanstd(matrix, axis=1, ddof=1)
+    acf = batch_acf(matrix, lengths, nlags=lags)
+    q_stats, q_pvalues = ljung_box(acf, lengths, lags=lags)
+    jb_stats, jb_pvalues, skew, kurtosis = jarque_bera(matrix, lengths)
+
+    table = pd.DataFrame({'n': lengths,
+                          'bias': bias,
+                          'bias_t': bias / (std / np.sqrt(lengths)),
+                          'mae': np.nanmean(np.abs(matrix), axis=1),
+                          'rmse': np.sqrt(np.nanmean(matrix ** 2, axis=1)),
+                          'std': std,
+                          'skew': skew,
+                          'kurtosis': kurtosis,
+                          'jb_stat': jb_stats,
+                          'jb_pvalue': jb_pvalues,
+                          'lb_stat': q_stats[:, -1],
+                          'lb_pvalue': np.nanmax(q_pvalues, axis=1)})
+    for lag in range(1, lags + 1):
+        table['acf_' + str(lag)] = acf[:, lag]
+
+    if names and all(isinstance(name, tuple) for name in names):
+        table.index = pd.MultiIndex.from_tuples(names)
+    else:
+        table.index = names
+    return table
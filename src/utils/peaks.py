@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+from src.utils.utils import top_k_mask
+
+
+def _forecast_rows(pred_values):
+    # get_pred_values frames hold the fitted values too, only the forecasts are simulated
+    if "is_forecast" in pred_values.columns:
+        pred_values = pred_values[pred_values["is_forecast"] == 1]
+    return pred_values
+
+
+def interval_sigma(pred_values, alpha=0.05):
+    """
+    Accepts a prediction frame with yhat_lower and yhat_upper, e.g. from get_pred_values
+    Returns the standard deviation of each forecast implied by its (1 - alpha) interval,
+    taken as symmetric and normal. Forecasts without an interval get 0, a point forecast
+    """
+    from scipy.stats import norm
+
+    width = pred_values["yhat_upper"] - pred_values["yhat_lower"]
+    return (width / (2 * norm.ppf(1 - alpha / 2))).fillna(0.0)
+
+
+def _simulate_chunk(means, sigmas, weights, observed, rho, k, n_sims, seed):
+    """
+    Simulates n_sims seasons: each draws a model by weight, then the forecast days from
+    that model's means with AR(1) correlated normal errors
+    Returns the number of simulations in which each day, observed ones first, is in the top k
+    """
+    rng = np.random.RandomState(seed)
+    n_models, n_days = means.shape
+    models = rng.choice(n_models, size=n_sims, p=weights)
+
+    # Days down the rows, so the AR(1) recursion runs over contiguous rows
+    season = np.empty((len(observed) + n_days, n_sims))
+    season[:len(observed)] = observed[:, np.newaxis]
+    errors = season[len(observed):]
+    errors[:] = rng.standard_normal((n_days, n_sims))
+    scale = np.sqrt(1 - rho ** 2)
+    for day in range(1, n_days):
+        errors[day] *= scale
+        errors[day] += rho * errors[day - 1]
+    for model in range(n_models):
+        drawn = models == model
+        errors[:, drawn] *= sigmas[model][:, np.newaxis]
+        errors[:, drawn] += means[model][:, np.newaxis]
+    return top_k_mask(season.T, k).sum(axis=0)
+
+
+def top_k_probability(pred_values, observed_peaks=None, k=5, n_sims=100000, rho=0.0,
+                      weights=None, alpha=0.05, memory_mb=64, seed=None):
+    """
+    Accepts one prediction frame or a list of them, one row per day, with yhat, yhat_lower
+    and yhat_upper, e.g. get_pred_values of daily peaks or StreamingSARIMAX.peak_forecast,
+    and a Series of the daily peaks already observed this season
+    Estimates the probability that each day of the season is among its k highest days:
+    n_sims seasons are drawn, each from one of the frames (chosen by weights, equal by
+    default), with each forecast day normal around yhat with the sigma of its interval
+    (see interval_sigma) and an AR(1) correlation rho between consecutive days' errors
+    The simulations run in chunks sized to memory_mb, so memory is bounded whatever n_sims
+    is. As simulate_hit_counts, each chunk has its own seed drawn from seed
+    Returns a DataFrame indexed by day, observed days first, of y (the observed peak),
+    yhat (the weighted mean forecast), probability and is_forecast
+    """
+    frames = [pred_values] if isinstance(pred_values, pd.DataFrame) else list(pred_values)
+    frames = [_forecast_rows(frame) for frame in frames]
+    days = frames[0].index
+    if observed_peaks is None:
+        observed_peaks = pd.Series([], index=days[:0], dtype=float)
+    days = days[~days.isin(observed_peaks.index)]
+    for frame in frames[1:]:
+        if not days.isin(frame.index).all():
+            raise ValueError("every prediction frame must forecast the same days")
+
+    means = np.array([frame.loc[days, "yhat"].values for frame in frames], dtype=float)
+    sigmas = np.array([interval_sigma(frame.loc[days], alpha).values for frame in frames])
+    weights = np.full(len(frames), 1 / len(frames)) if weights is None else np.asarray(weights)
+    weights = weights / weights.sum()
+    observed = observed_peaks.values.astype(float)
+
+    # The season matrix, its random draws and top_k_mask's workings take about 8 floats a day
+    n_days = len(observed) + len(days)
+    chunk_size = max(1, int(memory_mb * 2 ** 20 // (8 * 8 * max(n_days, 1))))
+    chunk_sizes = [chunk_size] * (n_sims // chunk_size)
+    if n_sims % chunk_size:
+        chunk_sizes.append(n_sims % chunk_size)
+    chunk_seeds = np.random.RandomState(seed).randint(0, 2 ** 31 - 1, size=len(chunk_sizes))
+
+    counts = np.zeros(n_days)
+    for size, chunk_seed in zip(chunk_sizes, chunk_seeds):
+        counts += _simulate_chunk(means, sigmas, weights, observed, rho, k, size, chunk_seed)
+
+    return pd.DataFrame({"y": np.concatenate([observed, np.full(len(days), np.nan)]),
+                         "yhat": np.concatenate([np.full(len(observed), np.nan),
+                                                 weights @ means]),
+                         "probability": counts / n_sims,
+                         "is_forecast": np.repeat([0, 1], [len(observed), len(days)])},
+                        index=observed_peaks.index.append(days))
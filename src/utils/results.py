@@ -0,0 +1,159 @@
+import contextlib
+import datetime
+import pathlib
+import sqlite3
+
+import pandas as pd
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    model TEXT NOT NULL,
+    fold_year INTEGER NOT NULL,
+    split TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL,
+    runtime REAL,
+    created TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_lookup ON results (split, model, metric, fold_year);
+"""
+
+
+class ResultsStore:
+    """
+    An append-only SQLite store of cross validation results, replacing the results CSV
+    Each row is one (model, fold year, split, metric, value, runtime) observation.
+    Rows are only ever inserted, each call in a single transaction, and the database runs
+    in WAL mode, so several experiments can write at once while others read.
+    When a model is run again, its latest rows take precedence
+    wide returns the layout save_run_results wrote: fold years down the rows,
+    (model, metric) across the columns
+    """
+
+    def __init__(self, db_path, timeout=60):
+        self.db_path = pathlib.Path(db_path)
+        self.timeout = timeout
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # A connection per call, so the store can be shared by threads and processes
+        conn = sqlite3.connect(str(self.db_path), timeout=self.timeout, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        # sqlite3's own context manager commits but never closes the connection
+        return contextlib.closing(conn)
+
+    def append(self, rows):
+        """
+        Accepts an iterable of (model, fold_year, split, metric, value, runtime) tuples
+        Inserts them in one transaction
+        Returns the number of rows inserted
+        """
+        created = datetime.datetime.now().isoformat(timespec="seconds")
+        rows = [(str(model), int(fold_year), str(split), str(metric),
+                 None if value is None else float(value),
+                 None if runtime is None else float(runtime), created)
+                for model, fold_year, split, metric, value, runtime in rows]
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT INTO results"
+                    " (model, fold_year, split, metric, value, runtime, created)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        return len(rows)
+
+    def append_run(self, X, n_splits, model_str, some_dict, runtime=None):
+        """
+        Accepts the same arguments as save_run_results: the dataset that was split,
+        the number of splits, the model name and the dict returned by run_cross_val
+        runtime is an optional number of seconds, either one per fold or one for the run
+        Stores every split and metric of the run
+        Returns the number of rows inserted
+        """
+        years = X.index.year.unique()
+        fold_years = list(range(years[-n_splits], years[-1] + 1))
+        if runtime is None or isinstance(runtime, (int, float)):
+            runtimes = [runtime] * len(fold_years)
+        else:
+            runtimes = list(runtime)
+
+        rows = []
+        for split, metrics in some_dict.items():
+            for metric, values in metrics.items():
+                for fold_year, value, fold_runtime in zip(fold_years, values, runtimes):
+                    rows.append((model_str, fold_year, split, metric, value, fold_runtime))
+        return self.append(rows)
+
+    def query(self, split=None, models=None, metrics=None, fold_years=None, latest=True):
+        """
+        Returns the matching rows as a long DataFrame, in insertion order
+        With latest, only the most recent row of each (model, fold year, split, metric) is kept
+        """
+        clauses, params = [], []
+        for column, values in (("split", None if split is None else [split]),
+                               ("model", models), ("metric", metrics),
+                               ("fold_year", fold_years)):
+            if values is not None:
+                values = list(values)
+                clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        sql = f"SELECT * FROM results{where}"
+        if latest:
+            sql = (f"SELECT * FROM results WHERE id IN (SELECT MAX(id) FROM results{where}"
+                   " GROUP BY model, fold_year, split, metric)")
+        with self._connect() as conn:
+            df = pd.read_sql_query(sql + " ORDER BY id", conn, params=params)
+        return df
+
+    def models(self):
+        """
+        Returns the stored model names, in the order they were first added
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT model FROM results GROUP BY model ORDER BY MIN(id)").fetchall()
+        return [row[0] for row in rows]
+
+    def wide(self, split="test", models=None, metrics=None):
+        """
+        Returns the results of split in the layout of the results CSV:
+        indexed by fold year, with (model, metric) MultiIndex columns,
+        models in the order they were first added and metrics in the order they were stored
+        """
+        long_df = self.query(split=split, models=models, metrics=metrics)
+        if models is None:
+            models = [model for model in self.models() if model in set(long_df["model"])]
+        columns = []
+        for model in models:
+            model_metrics = long_df.loc[long_df["model"] == model, "metric"]
+            columns.extend((model, metric) for metric in pd.unique(model_metrics))
+
+        df = long_df.pivot_table(index="fold_year", columns=["model", "metric"],
+                                 values="value", aggfunc="last", dropna=False)
+        df = df.reindex(columns=pd.MultiIndex.from_tuples(columns))
+        df.index.name = None
+        return df
+
+    def import_wide(self, df, split="test"):
+        """
+        Accepts a DataFrame in the results CSV layout, e.g. read with header=[0, 1]
+        Appends its values, so existing results can be moved into the store
+        Returns the number of rows inserted
+        """
+        rows = [(model, fold_year, split, metric, value, None)
+                for (model, metric), values in df.items()
+                for fold_year, value in values.items()
+                if pd.notna(value)]
+        return self.append(rows)
+
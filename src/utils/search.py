@@ -0,0 +1,201 @@
+import hashlib
+import json
+import math
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.utils.cache import fingerprint_frame, params_token
+from src.utils.utils import _clone_fit_and_predict, _iter_folds, _score_fold, resolve_n_jobs
+
+SCORING = ["bound_precision", "mae"]
+
+
+def _candidate_key(params):
+    # Tuples such as SARIMAX orders are written as json lists, repr covers anything else
+    return json.dumps(params, sort_keys=True, default=repr)
+
+
+def _checkpoint_header(X, y, cv_splitter, pipeline):
+    """
+    Returns the first record of a checkpoint: fingerprints of the data, the splitter and
+    the base pipeline, so the scores of one search are never resumed into another
+    """
+    def token_digest(obj):
+        # params_token describes objects without their memory addresses, unlike repr
+        return hashlib.sha256(repr(params_token(obj)).encode()).hexdigest()
+
+    return {"header": 1, "X": fingerprint_frame(X), "y": fingerprint_frame(y),
+            "splitter": token_digest(cv_splitter), "pipeline": token_digest(pipeline)}
+
+
+def _read_checkpoint(checkpoint, header, restart=False):
+    """
+    Returns a {(candidate key, fold): (train scores, test scores)} dict of the work units
+    recorded in a checkpoint file written with the same header
+    A partly written final line, left by an interrupted write, is skipped and cut from the
+    file, so the next record starts on a line of its own
+    If the file was written with a different header, or without one, a ValueError is raised,
+    or with restart the file is started again
+    """
+    data = checkpoint.read_bytes() if checkpoint.exists() else b""
+    complete = data[:data.rfind(b"\n") + 1]
+    if len(complete) < len(data):
+        with open(checkpoint, "r+b") as f:
+            f.truncate(len(complete))
+
+    lines = complete.decode().splitlines()
+    if lines and lines[0] != json.dumps(header):
+        if not restart:
+            raise ValueError(f"checkpoint {checkpoint} was written by a search with other data, "
+                             "splitter or pipeline. Remove it, or pass restart_checkpoint=True")
+        lines = []
+    if not lines:
+        checkpoint.parent.mkdir(parents=True, exist_ok=True)
+        checkpoint.write_text(json.dumps(header) + "\n")
+
+    done = {}
+    for line in lines[1:]:
+        record = json.loads(line)
+        done[(record["candidate"], record["fold"])] = (record["train"], record["test"])
+    return done
+
+
+def _rank(scores):
+    """
+    Accepts a {candidate index: [(train scores, test scores) per fold]} dict
+    Returns the candidate indices, best first: highest mean test bound_precision,
+    then lowest mean test mae
+    """
+    means = {indx: np.mean([test for _, test in fold_scores], axis=0)
+             for indx, fold_scores in scores.items()}
+    return sorted(means, key=lambda indx: (-means[indx][0], means[indx][1]))
+
+
+def successive_halving(X, y, cv_splitter, pipeline, candidates, eta=2, min_folds=1,
+                       n_jobs=None, executor=None, checkpoint=None, cache=None,
+                       restart_checkpoint=False):
+    """
+    Searches candidate parameter settings for pipeline, e.g. SK_SARIMAX orders,
+    or SK_Prophet regressors dicts
+    candidates is a list of dicts passed to clone(pipeline).set_params
+    Every candidate is scored on the first min_folds folds of cv_splitter. The best
+    1 / eta of them go on to the first min_folds * eta folds, and so on until the
+    survivors have been scored on every fold, so poor settings never reach the later,
+    more expensive folds
+    Candidates are ranked by mean test bound_precision, with mean test mae breaking ties
+    The (candidate, fold) work units of each round run in parallel with n_jobs
+    (as joblib, -1 for all cores) or an executor. checkpoint is a jsonl file each finished unit is
+    appended to, so an interrupted search resumes without refitting them. Its first line
+    fingerprints X, y, cv_splitter and pipeline: resuming with any of them changed raises
+    a ValueError, or with restart_checkpoint starts the file again
+    cache is an optional src.utils.cache.FoldCache, shared with run_cross_val
+    Returns a DataFrame of every candidate, with its parameters, the number of folds it was
+    scored on, its mean train and test scores and the round it reached, best first:
+    the winner is the first row
+    """
+    from sklearn.base import clone
+
+    folds = list(_iter_folds(X, y, cv_splitter))
+    pipelines = [clone(pipeline).set_params(**params) for params in candidates]
+    keys = [_candidate_key(params) for params in candidates]
+
+    checkpoint = None if checkpoint is None else pathlib.Path(checkpoint)
+    done = {}
+    if checkpoint is not None:
+        done = _read_checkpoint(checkpoint, _checkpoint_header(X, y, cv_splitter, pipeline),
+                                restart=restart_checkpoint)
+
+    pool = executor
+    if pool is None and resolve_n_jobs(n_jobs) > 1:
+        pool = ProcessPoolExecutor(max_workers=resolve_n_jobs(n_jobs))
+
+    scores = {indx: [] for indx in range(len(candidates))}
+    reached = {indx: 0 for indx in range(len(candidates))}
+    survivors = list(range(len(candidates)))
+    n_folds, rung = min(min_folds, len(folds)), 0
+    try:
+        while True:
+            units = [(indx, fold) for indx in survivors
+                     for fold in range(len(scores[indx]), n_folds)]
+            unit_scores = _run_units(units, pipelines, keys, folds, done, pool, checkpoint,
+                                     cache, cv_splitter)
+            for (indx, _), fold_scores in zip(units, unit_scores):
+                scores[indx].append(fold_scores)
+            for indx in survivors:
+                reached[indx] = rung
+
+            if n_folds == len(folds) or len(survivors) == 1:
+                break
+            survivors = _rank({indx: scores[indx] for indx in survivors})
+            survivors = survivors[:max(1, math.ceil(len(survivors) / eta))]
+            n_folds = min(n_folds * eta, len(folds))
+            rung += 1
+    finally:
+        if executor is None and pool is not None:
+            pool.shutdown()
+
+    # Candidates that reached later rounds were scored on more folds, so they rank first
+    ranked = _rank(scores)
+    ranked = sorted(ranked, key=lambda indx: (-reached[indx], ranked.index(indx)))
+    rows = []
+    for indx in ranked:
+        row = {"params": candidates[indx], "n_folds": len(scores[indx]), "rung": reached[indx]}
+        for split, position in (("train", 0), ("test", 1)):
+            means = np.mean([fold_scores[position] for fold_scores in scores[indx]], axis=0)
+            for metric, mean in zip(SCORING, means):
+                row[f"{split}_{metric}"] = mean
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def _run_units(units, pipelines, keys, folds, done, pool, checkpoint, cache, cv_splitter):
+    """
+    Fits and scores each (candidate index, fold) unit that is not already done,
+    recording it in the checkpoint as it finishes
+    Returns a list of (train scores, test scores) in unit order
+    """
+    results = {}
+    todo = []
+    for indx, fold in units:
+        if (keys[indx], fold) in done:
+            results[(indx, fold)] = done[(keys[indx], fold)]
+            continue
+        preds = None
+        if cache is not None:
+            cache_key = cache.fold_key(*folds[fold], cv_splitter=cv_splitter,
+                                       pipeline=pipelines[indx])
+            preds = cache.get(cache_key)
+        if preds is None:
+            todo.append((indx, fold))
+        else:
+            results[(indx, fold)] = _score_fold(folds[fold][1], preds[0], folds[fold][3],
+                                                preds[1], SCORING)
+
+    if pool is None:
+        preds = (_clone_fit_and_predict(pipelines[indx], *folds[fold][:3])
+                 for indx, fold in todo)
+    else:
+        futures = [pool.submit(_clone_fit_and_predict, pipelines[indx], *folds[fold][:3])
+                   for indx, fold in todo]
+        preds = (future.result() for future in futures)
+
+    for (indx, fold), fold_preds in zip(todo, preds):
+        X_train, y_train, X_test, y_test = folds[fold]
+        if cache is not None:
+            cache.put(cache.fold_key(X_train, y_train, X_test, y_test, cv_splitter=cv_splitter,
+                                     pipeline=pipelines[indx]), *fold_preds)
+        train_scores, test_scores = _score_fold(y_train, fold_preds[0], y_test, fold_preds[1],
+                                                SCORING)
+        train_scores = [float(score) for score in train_scores]
+        test_scores = [float(score) for score in test_scores]
+        results[(indx, fold)] = (train_scores, test_scores)
+        done[(keys[indx], fold)] = results[(indx, fold)]
+        if checkpoint is not None:
+            with open(checkpoint, "a") as f:
+                f.write(json.dumps({"candidate": keys[indx], "fold": fold,
+                                    "train": train_scores, "test": test_scores}) + "\n")
+
+    return [results[unit] for unit in units]
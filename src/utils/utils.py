@@ -1,71 +1,158 @@
+import os
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
 
-from statsmodels.stats.diagnostic import acorr_ljungbox
-from statsmodels.stats.stattools import jarque_bera
+# sklearn is imported on first use, so that importing the splitters and
+# bound_precision stays cheap for scoring processes
+
+
+class AnnualWindowSplit():
+    """
+    Instantiate with number of folds
+    split accepts a pandas dataframe indexed by datetime covering multiple years sorted ascending
+    The final n_splits years are each returned in turn as the validation set,
+    walking up the timeseries yielding the positions of each train, test split
+
+    window: None trains on every year before the validation year (expanding window),
+            an integer trains on that many years only (rolling window)
+    gap: number of years left out between the final train year and the validation year
+    test_months: optional (first month, last month) pair restricting the validation set
+                 to part of the year, e.g. (6, 9) for the June - September peak season
+    as_slices: yields slice objects, so that iloc returns views rather than copies.
+               False yields NumPy position ranges instead
+
+    All the year and month boundaries are found with a single searchsorted on the index
+    """
+    def __init__(self, n_splits, window=None, gap=0, test_months=None, as_slices=True):
+        self.n_splits = n_splits
+        self.window = window
+        self.gap = gap
+        self.test_months = test_months
+        self.as_slices = as_slices
+
+    def get_n_splits(self, X=None, y=None, groups=None):
+        return self.n_splits
+
+    def _boundaries(self, index):
+        """
+        Returns a {(year, month): position} dict of the first position at or after
+        the 1st of each month needed by the splits
+        """
+        if not index.is_monotonic_increasing:
+            raise ValueError("split requires a datetime index sorted ascending")
+
+        final_year = index[-1].year
+        test_years = range(final_year - self.n_splits + 1, final_year + 1)
+        keys = [(year, 1) for year in range(index[0].year, final_year + 2)]
+        if self.test_months is not None:
+            first_month, last_month = self.test_months
+            for year in test_years:
+                keys.append((year, first_month))
+                keys.append((year + last_month // 12, last_month % 12 + 1))
 
-from sklearn.metrics import (
-    mean_absolute_error,
-    r2_score,
-    median_absolute_error,
-    mean_squared_error,
-    mean_squared_log_error,
-)
+        stamps = pd.to_datetime(["{}-{:02d}-01".format(year, month) for year, month in keys])
+        if index.tz is not None:
+            stamps = stamps.tz_localize(index.tz)
+        positions = index.searchsorted(stamps)
 
+        return dict(zip(keys, positions))
 
-class AnnualTimeSeriesSplit():
+    def _positions(self, start, stop):
+        if self.as_slices:
+            return slice(start, stop)
+        return np.arange(start, stop)
+
+    def split(self, X, y=None, groups=None):
+        bounds = self._boundaries(X.index)
+        final_year = X.index[-1].year
+
+        for test_year in range(final_year - self.n_splits + 1, final_year + 1):
+            final_train_year = test_year - self.gap - 1
+
+            train_final_index = bounds.get((final_train_year + 1, 1), 0)
+            if self.window is None:
+                train_start_index = 0
+            else:
+                train_start_index = bounds.get((final_train_year - self.window + 1, 1), 0)
+
+            if self.test_months is None:
+                test_start_index = bounds[(test_year, 1)]
+                test_final_index = bounds[(test_year + 1, 1)]
+            else:
+                first_month, last_month = self.test_months
+                test_start_index = bounds[(test_year, first_month)]
+                test_final_index = bounds[(test_year + last_month // 12, last_month % 12 + 1)]
+
+            if train_final_index <= train_start_index:
+                raise ValueError(f"No training data before the {test_year} validation year")
+
+            yield (self._positions(train_start_index, train_final_index),
+                   self._positions(test_start_index, test_final_index))
+
+
+class AnnualTimeSeriesSplit(AnnualWindowSplit):
     """
     Instantiate with number of folds
     split accepts a pandas dataframe indexed by datetime covering multiple years sorted ascending
     Splits to the number of folds, with a single year returned as the validation set
-    Walks up the timeseries yielding the indices from each train, test split
+    Walks up the timeseries yielding the positions from each train, test split as slices
     """
     def __init__(self, n_splits):
-        self.n_splits = n_splits
-        
-    def split(self, X, y=None, groups=None):
-        years = X.index.year.unique()
-        
-        for ind, year in enumerate(years[0:self.n_splits]):
-            
-            final_train_year = years[-1] - self.n_splits + ind
-            
-            train_final_index = X.index.get_loc(str(final_train_year)).stop
-            test_final_index = X.index.get_loc(str(final_train_year + 1)).stop
-            
-            train_indices = list(range(0, train_final_index))
-            test_indices = list(range(train_final_index, test_final_index))
-            
-            yield train_indices, test_indices
-
-            
-class RollingAnnualTimeSeriesSplit():
+        super().__init__(n_splits)
+
+
+class RollingAnnualTimeSeriesSplit(AnnualWindowSplit):
     """
     Instantiate with number of folds
     split accepts a pandas dataframe indexed by datetime covering multiple years sorted ascending
     Splits to the number of folds, with a single year returned as the validation set
-    Walks up the timeseries yielding the indices from each train, test split
+    and the preceding goback_years returned as the train set
+    Walks up the timeseries yielding the positions from each train, test split as slices
     """
     def __init__(self, n_splits, goback_years=5):
-        self.n_splits = n_splits
+        super().__init__(n_splits, window=goback_years)
         self.goback_years = goback_years
-        
-    def split(self, X, y=None, groups=None):
-        years = X.index.year.unique()
-        
-        for ind, year in enumerate(years[0:self.n_splits]):
-            
-            final_train_year = years[-1] - self.n_splits + ind
-            start_train_year = final_train_year - self.goback_years +1
-            print(f'{final_train_year+1}')
-            
-            train_start_index = X.index.get_loc(str(start_train_year)).start
-            train_final_index = X.index.get_loc(str(final_train_year)).stop
-            test_final_index = X.index.get_loc(str(final_train_year + 1)).stop
-            
-            train_indices = list(range(train_start_index, train_final_index))
-            test_indices = list(range(train_final_index, test_final_index))
-            
-            yield train_indices, test_indices
+
+
+def top_k_mask(values, k):
+    """
+    Accepts a 2-D array of shape (samples, days), and an integer k
+    Returns a boolean array of the same shape, True at the k highest values of each row
+    Ties at the k-th highest value go to the earliest days
+    NaN ranks below every value
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    n_days = values.shape[1]
+    k = min(k, n_days)
+    if k == 0:
+        return np.zeros(values.shape, dtype=bool)
+
+    filled = np.where(np.isnan(values), -np.inf, values)
+    kth_pos = np.argpartition(-filled, k - 1, axis=1)[:, k - 1:k]
+    kth_value = np.take_along_axis(filled, kth_pos, axis=1)
+
+    above = filled > kth_value
+    tied = filled == kth_value
+    # Fill the places left after the strictly higher values with the earliest tied days
+    n_tied_needed = k - above.sum(axis=1, keepdims=True)
+    return above | (tied & (np.cumsum(tied, axis=1) <= n_tied_needed))
+
+
+def batch_bound_precision(y_actual, y_predicted, n_to_check=5):
+    """
+    Accepts two arrays of shape (samples, days), and an integer n_to_check
+    e.g. one row per summer, per fold, or per bootstrap draw.
+    A single 1-D row is broadcast against the other array's rows
+    For each row, determines how many of the n_to_check highest actual days
+    are also among the n_to_check highest predicted days
+    Returns a 1-D array of the number of hits divided by n_to_check
+    """
+    act_top = top_k_mask(y_actual, n_to_check)
+    pred_top = top_k_mask(y_predicted, n_to_check)
+    return (act_top & pred_top).sum(axis=1) / n_to_check
 
 
 def bound_precision(y_actual: pd.Series, y_predicted: pd.Series, n_to_check=5):
@@ -74,31 +161,173 @@ def bound_precision(y_actual: pd.Series, y_predicted: pd.Series, n_to_check=5):
     Series are:
     + actual values
     + predicted values
-    Sorts each series by value from high to low, and cuts off each series at n_to_check
-    Determines how many hits - ie how many of the indices in the actual series are in the predicted series indices
+    Values are matched by position, not by index
+    Determines how many of the n_to_check highest actual values are also among
+    the n_to_check highest predicted values, see batch_bound_precision
     Returns number of hits divided by n_to_check    
     """
-    y_act = y_actual.copy(deep=True)
-    y_pred = y_predicted.copy(deep=True)
-    y_act.reset_index(drop=True, inplace=True)
-    y_pred.reset_index(drop=True, inplace=True)
+    return float(batch_bound_precision(np.asarray(y_actual), np.asarray(y_predicted), n_to_check)[0])
+
+
+# Names of the sklearn.metrics functions behind each scoring name
+SKLEARN_METRICS = {
+    "mae": "mean_absolute_error",
+    "r2_score": "r2_score",
+    "median_absolute_error": "median_absolute_error",
+    "mean_squared_error": "mean_squared_error",
+    "mean_squared_log_error": "mean_squared_log_error",
+}
+
+
+def get_scoring_function(metric):
+    """
+    Accepts a scoring name as used by run_cross_val, e.g. 'bound_precision' or 'mae'
+    Returns the scoring function, importing sklearn.metrics on first use
+    """
+    if metric == "bound_precision":
+        return bound_precision
+    import sklearn.metrics
+    return getattr(sklearn.metrics, SKLEARN_METRICS[metric])
+
+
+def _iter_folds(X, y, cv_splitter):
+    """
+    Yields the (X_train, y_train, X_test, y_test) slices for each split of cv_splitter
+    """
+    for train_indx, val_indx in cv_splitter.split(X):
+        yield X.iloc[train_indx], y.iloc[train_indx], X.iloc[val_indx], y.iloc[val_indx]
+
+
+def _fit_and_predict(pipeline, X_train, y_train, X_test):
+    """
+    Fits the pipeline on the train slice, predicts on train then test
+    Returns a tuple of (train predictions, test predictions)
+    """
+    pipeline.fit(X_train, y_train)
+    y_train_pred = pipeline.predict(X_train)
+    y_test_pred = pipeline.predict(X_test)
+    return y_train_pred, y_test_pred
+
+
+def _clone_fit_and_predict(pipeline, X_train, y_train, X_test):
+    from sklearn.base import clone
+    # Each work unit gets its own copy of the pipeline, so units never share fitted state
+    # safe=False falls back to a deepcopy for wrappers that do not implement get_params
+    return _fit_and_predict(clone(pipeline, safe=False), X_train, y_train, X_test)
+
+
+def _score_fold(y_train, y_train_pred, y_test, y_test_pred, scoring):
+    """
+    Returns a tuple of (train scores, test scores), each a list ordered as scoring
+    """
+    scorers = [get_scoring_function(metric) for metric in scoring]
+    train_scores = [scorer(y_train, y_train_pred) for scorer in scorers]
+    test_scores = [scorer(y_test, y_test_pred) for scorer in scorers]
+    return train_scores, test_scores
+
+
+def resolve_n_jobs(n_jobs):
+    """
+    Accepts n_jobs as sklearn and joblib take it
+    Returns the number of worker processes: None is 1, -1 is every core,
+    -2 every core but one, and so on, never fewer than 1
+    """
+    if n_jobs is None:
+        return 1
+    if n_jobs == 0:
+        raise ValueError("n_jobs == 0 has no meaning, use None or 1 to run in this process")
+    if n_jobs < 0:
+        return max(os.cpu_count() + 1 + n_jobs, 1)
+    return n_jobs
+
+
+def _evaluate_folds(folds, pipeline, scoring, n_jobs=None, executor=None,
+                    cache=None, cv_splitter=None, fit_last=True):
+    """
+    Accepts an iterable of (X_train, y_train, X_test, y_test) folds
+    With n_jobs of None or 1, and no executor, the folds are fitted one after another
+    on the pipeline passed in, exactly as before
+    Otherwise every fold but the last is fitted on a clone of the pipeline in a process pool.
+    n_jobs follows joblib, see resolve_n_jobs. An externally managed concurrent.futures
+    executor can be passed instead, and is left running
+    The last fold is always fitted on the pipeline passed in, in this process, so the
+    pipeline is left fitted on the last fold (e.g. for get_pred_values) either way
+    With a FoldCache, folds whose predictions are already cached are not refitted,
+    and the scores are recomputed from the cached predictions. The last fold is the
+    exception: it is refitted on a hit, so a warm cache leaves the pipeline in the same
+    state as a cold one. fit_last=False skips that, for callers that fit a later fold
+    Returns a list of (train scores, test scores) in fold order
+    """
+    def cache_key(fold):
+        if cache is None:
+            return None
+        return cache.fold_key(*fold, cv_splitter=cv_splitter, pipeline=pipeline)
+
+    def cache_get(key):
+        return cache.get(key) if cache is not None else None
+
+    def cache_put(key, preds):
+        if cache is not None:
+            cache.put(key, *preds)
+
+    n_workers = resolve_n_jobs(n_jobs)
+    if executor is None and n_workers == 1:
+        fold_scores = []
+        fitted = True
+        for fold in folds:
+            X_train, y_train, X_test, y_test = fold
+            key = cache_key(fold)
+            preds = cache_get(key)
+            fitted = preds is None
+            if fitted:
+                preds = _fit_and_predict(pipeline, X_train, y_train, X_test)
+                cache_put(key, preds)
+            fold_scores.append(_score_fold(y_train, preds[0], y_test, preds[1], scoring))
+        if fit_last and not fitted:
+            _fit_and_predict(pipeline, X_train, y_train, X_test)
+        return fold_scores
+
+    from sklearn.base import clone
 
-    act_dates =set( y_act.sort_values(ascending=False).head(n_to_check).index)
-    pred_dates = set(y_pred.sort_values(ascending=False).head(n_to_check).index)
-    bound_precision =  len(act_dates.intersection(pred_dates))/ n_to_check
-    return bound_precision
+    folds = list(folds)
+    keys = [cache_key(fold) for fold in folds]
+    fold_preds = [cache_get(key) for key in keys]
+    # The workers get an unfitted copy, as the pool may pickle it while the
+    # pipeline passed in is being fitted on the last fold
+    template = clone(pipeline, safe=False)
 
+    pool = executor
+    if pool is None:
+        pool = ProcessPoolExecutor(max_workers=n_workers)
+    try:
+        futures = {
+            indx: pool.submit(_clone_fit_and_predict, template, X_train, y_train, X_test)
+            for indx, (X_train, y_train, X_test, _) in enumerate(folds[:-1])
+            if fold_preds[indx] is None
+        }
+        if folds and (fit_last or fold_preds[-1] is None):
+            X_train, y_train, X_test, _ = folds[-1]
+            preds = _fit_and_predict(pipeline, X_train, y_train, X_test)
+            if fold_preds[-1] is None:
+                fold_preds[-1] = preds
+                cache_put(keys[-1], preds)
+        for indx, future in futures.items():
+            fold_preds[indx] = future.result()
+            cache_put(keys[indx], fold_preds[indx])
+    finally:
+        if executor is None:
+            pool.shutdown()
 
-def run_cross_val(X, y, cv_splitter, pipeline, scoring=["bound_precision", "mae"]):
-    scoring_dict = {
-        "bound_precision": bound_precision,
-        "mae": mean_absolute_error,
-        "r2_score": r2_score,
-        "median_absolute_error": median_absolute_error,
-        "mean_squared_error": mean_squared_error,
-        "mean_squared_log_error": mean_squared_log_error,
-    }
+    return [
+        _score_fold(y_train, preds[0], y_test, preds[1], scoring)
+        for (_, y_train, _, y_test), preds in zip(folds, fold_preds)
+    ]
 
+
+def _collect_scores(fold_scores, scoring):
+    """
+    Rebuilds the scores_dicts layout from a list of (train scores, test scores)
+    """
     scores_dicts = {}
     scores_dicts["train"] = {}
     scores_dicts["test"] = {}
@@ -107,28 +336,31 @@ def run_cross_val(X, y, cv_splitter, pipeline, scoring=["bound_precision", "mae"
         scores_dicts["train"][metric] = []
         scores_dicts["test"][metric] = []
 
-    for train_indx, val_indx in cv_splitter.split(X):
-        X_train = X.iloc[train_indx]
-        y_train = y.iloc[train_indx]
-        X_test = X.iloc[val_indx]
-        y_test = y.iloc[val_indx]
-
-        pipeline.fit(X_train, y_train)
-        y_train_pred = pipeline.predict(X_train)
-
-        for metric in scoring:
-            score = scoring_dict[metric](y_train, y_train_pred)
+    for train_scores, test_scores in fold_scores:
+        for metric, score in zip(scoring, train_scores):
             scores_dicts["train"][metric].append(score)
-
-        y_test_pred = pipeline.predict(X_test)
-        for metric in scoring:
-            score = scoring_dict[metric](y_test, y_test_pred)
+        for metric, score in zip(scoring, test_scores):
             scores_dicts["test"][metric].append(score)
-            #print(f'test: {score}')
 
     return scores_dicts
 
 
+def run_cross_val(X, y, cv_splitter, pipeline, scoring=["bound_precision", "mae"],
+                  n_jobs=None, executor=None, cache=None):
+    """
+    Fits and scores the pipeline on every split produced by cv_splitter
+    n_jobs / executor fan the folds out to worker processes, see _evaluate_folds
+    cache is an optional src.utils.cache.FoldCache. Cached folds are not refitted,
+    except the last, so the pipeline is always left fitted on the last fold
+    Returns a dict of {'train': {metric: [score per fold]}, 'test': {...}}
+    """
+    folds = _iter_folds(X, y, cv_splitter)
+    fold_scores = _evaluate_folds(folds, pipeline, scoring, n_jobs=n_jobs, executor=executor,
+                                  cache=cache, cv_splitter=cv_splitter)
+
+    return _collect_scores(fold_scores, scoring)
+
+
 # data_split_dict
 # traintest_split_dict
 # metric_dict
@@ -157,62 +389,145 @@ def run_cross_val(X, y, cv_splitter, pipeline, scoring=["bound_precision", "mae"
 #              }
 
 
+class GroupedPanel():
+    """
+    Instantiate with X, y and the column to group the rows by, e.g. day_of_week
+    Sorts the rows by group once, and keeps the positions of each group's rows in time order,
+    rather than materialising every group as its own DataFrame
+    X(group) and y(group) return a group's rows, iter_folds yields its cross validation
+    folds, with the splitter's positions mapped back onto X and y for a single iloc each
+    Groups are the sorted unique values of group_col, as in temporal_split
+    """
+    def __init__(self, X, y, group_col="day_of_week"):
+        self.X_all = X
+        self.y_all = y
+        self.group_col = group_col
+
+        codes, uniques = pd.factorize(X[group_col], sort=True)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        self.groups = list(uniques)
+        self.indices = {group: order[bounds[i]:bounds[i + 1]]
+                        for i, group in enumerate(self.groups)}
+
+    def __len__(self):
+        return len(self.groups)
+
+    def __iter__(self):
+        return iter(self.groups)
+
+    def X(self, group):
+        return self.X_all.iloc[self.indices[group]]
+
+    def y(self, group):
+        return self.y_all.iloc[self.indices[group]]
+
+    def split(self, group, cv_splitter):
+        """
+        Yields cv_splitter's (train, test) positions within the group, as positions in X
+        The splitter only sees an empty frame carrying the group's index
+        """
+        group_indices = self.indices[group]
+        index_only = pd.DataFrame(index=self.X_all.index[group_indices])
+        for train_indx, val_indx in cv_splitter.split(index_only):
+            yield group_indices[train_indx], group_indices[val_indx]
+
+    def iter_folds(self, group, cv_splitter):
+        """
+        Yields the (X_train, y_train, X_test, y_test) slices of a group for each split,
+        the same slices _iter_folds yields for that group's own DataFrame
+        """
+        for train_indx, val_indx in self.split(group, cv_splitter):
+            yield (self.X_all.iloc[train_indx], self.y_all.iloc[train_indx],
+                   self.X_all.iloc[val_indx], self.y_all.iloc[val_indx])
+
+
 def temporal_split(X, y, splitter_col="day_of_week"):
-    X_splits = []
-    y_splits = []
-    Xt = X.copy(deep=True)
-    yt = y.copy(deep=True)
-    split_flags = sorted(Xt[splitter_col].unique())
-    for split_flag in split_flags:
-        X_split = Xt[Xt[splitter_col] == split_flag]
-        X_splits.append(X_split)
-        y_splits.append(y.loc[X_split.index])
+    panel = GroupedPanel(X, y, splitter_col)
+    X_splits = [panel.X(split_flag) for split_flag in panel]
+    y_splits = [panel.y(split_flag) for split_flag in panel]
 
     return X_splits, y_splits
 
 
 def run_data_split_cross_val(
-    X, y, data_splitter_col, cv_splitter, model, scoring=["mae"]
+    X, y, data_splitter_col, cv_splitter, model, scoring=["mae"], n_jobs=None, executor=None,
+    cache=None
 ):
+    """
+    Splits the data by data_splitter_col, and cross validates the model on each split
+    The splits are positions in a GroupedPanel, so no split is copied out of X before
+    its folds are sliced
+    With n_jobs or an executor, every (split x fold) work unit is fanned out to
+    a single process pool, rather than one split at a time
+    Returns a dict of {split flag: scores_dicts}
+    """
 
     scores_dict = {}
 
-    X_splits, y_splits = temporal_split(X, y, data_splitter_col)
+    panel = GroupedPanel(X, y, data_splitter_col)
 
-    for (indx_splitter, X_split, y_split) in zip(
-        sorted(X[data_splitter_col].unique()), X_splits, y_splits
-    ):
-        scores_dict[indx_splitter] = run_cross_val(
-            X_split, y_split, cv_splitter, model, scoring=scoring
+    if executor is None and resolve_n_jobs(n_jobs) == 1:
+        for indx_splitter in panel:
+            # Only the final split's last fold needs refitting on a cache hit
+            fold_scores = _evaluate_folds(
+                panel.iter_folds(indx_splitter, cv_splitter), model, scoring, cache=cache,
+                cv_splitter=cv_splitter, fit_last=indx_splitter == panel.groups[-1]
+            )
+            scores_dict[indx_splitter] = _collect_scores(fold_scores, scoring)
+        return scores_dict
+
+    units = []
+    for indx_splitter in panel:
+        for fold in panel.iter_folds(indx_splitter, cv_splitter):
+            units.append((indx_splitter, fold))
+
+    fold_scores = _evaluate_folds(
+        [fold for _, fold in units], model, scoring, n_jobs=n_jobs, executor=executor,
+        cache=cache, cv_splitter=cv_splitter
+    )
+
+    for indx_splitter in panel:
+        scores_dict[indx_splitter] = _collect_scores(
+            [score for (flag, _), score in zip(units, fold_scores) if flag == indx_splitter],
+            scoring,
         )
     return scores_dict
 
-def save_run_results(X, n_splits, model_str, some_dict, save_path):
+def save_run_results(X, n_splits, model_str, some_dict, save_path, runtime=None):
     """
     Accepts a dataset used for splitting into train and test,
     number of splits in a Rolling Annual Cross Validation Scheme
     A dictionary of validation results
-    A save path for a dataframe
-    Updates the file and saves
-    Returns the updated file as a DataFrame
-    
-    """
-    if save_path.exists():
-        orig_df = pd.read_csv(save_path, index_col=0, header=[0,1] )
-        if model_str in orig_df.columns:
-            return "Model name already used"
-    else:
-        orig_df = None
-    test_dict_name = 'test'
-    n_metrics = len(some_dict[test_dict_name].keys())
-    
-    df = pd.DataFrame.from_dict(some_dict[test_dict_name])
-    df.index = list(range(X.index.year.unique()[-n_splits], X.index.year.unique()[-1]+1,1))
-    df.columns = pd.MultiIndex([[model_str], df.columns], labels = [[0]*n_metrics,list(range(n_metrics))])
-    
-    full_df = pd.concat([orig_df, df], axis=1)
-    
-    full_df.to_csv(save_path)
-    
-    return full_df   
+    A ResultsStore, or the path of its database
+    Appends every split and metric of the run to the store (see ResultsStore.append_run)
+    A .csv path, like the notebooks' RESULTS_PATH, is kept as an export: the results go to
+    the database of the same name ending in .db, the existing CSV is imported into it
+    the first time, and the CSV is rewritten from the store's wide layout. The export is
+    written to a temporary file and renamed over the CSV, so readers never see part of it
+    Unlike the CSV only version, a model_str that is already saved is not refused: the run
+    is appended, and its results replace the earlier run's in the returned frame and the
+    export (the earlier rows stay in the store, see ResultsStore.query(latest=False))
+    Returns the test results of every model as a DataFrame, in the results CSV layout
+    """
+    from src.utils.results import ResultsStore
+
+    csv_path = None
+    store = save_path
+    if not isinstance(store, ResultsStore):
+        save_path = pathlib.Path(save_path)
+        if save_path.suffix == '.csv':
+            csv_path, save_path = save_path, save_path.with_suffix('.db')
+        is_new = not save_path.exists()
+        store = ResultsStore(save_path)
+        if is_new and csv_path is not None and csv_path.exists():
+            store.import_wide(pd.read_csv(csv_path, index_col=0, header=[0, 1]))
+
+    store.append_run(X, n_splits, model_str, some_dict, runtime=runtime)
+    full_df = store.wide()
+    if csv_path is not None:
+        tmp_path = csv_path.with_name(f'.{csv_path.name}.{os.getpid()}.tmp')
+        full_df.to_csv(tmp_path)
+        os.replace(tmp_path, csv_path)
+    return full_df
 
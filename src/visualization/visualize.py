@@ -1,26 +1,106 @@
-import matplotlib.pyplot as plt
-from pandas.plotting import register_matplotlib_converters
-import seaborn as sns
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
-from matplotlib.dates import DateFormatter
 
-from scipy.stats import norm
-from statsmodels.graphics.gofplots import qqplot
-from pandas.plotting import autocorrelation_plot
-from statsmodels.graphics.tsaplots import plot_acf
-from statsmodels.stats.diagnostic import acorr_ljungbox
-from statsmodels.stats.stattools import jarque_bera
+from src.utils.utils import resolve_n_jobs
+
+# matplotlib, seaborn, scipy and statsmodels are imported by the functions that plot,
+# so importing this module doesn't load a plotting backend
+_converters_registered = False
+
+
+def _pyplot():
+    """
+    Imports pyplot on first use, and registers pandas' date converters with matplotlib once
+    """
+    global _converters_registered
+    import matplotlib.pyplot as plt
+
+    if not _converters_registered:
+        from pandas.plotting import register_matplotlib_converters
+        register_matplotlib_converters()
+        _converters_registered = True
+    return plt
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling
+    Accepts ascending x values, y values and the number of points to keep
+    Returns the positions of the n_out points that best preserve the line's shape,
+    always including the first and last points
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Buckets of the points between the first and the last, with integer arithmetic so that
+    # no edge is rounded down a point
+    edges = 1 + np.arange(n_out - 1) * (n - 2) // (n_out - 2)
+    bucket_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / np.diff(edges)
+    bucket_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / np.diff(edges)
+
+    selected = np.empty(n_out, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        if i + 1 < n_out - 2:
+            next_x, next_y = bucket_x[i + 1], bucket_y[i + 1]
+        else:
+            next_x, next_y = x[-1], y[-1]
+        # Twice the area of the triangle from the previous point, to each candidate,
+        # to the average of the next bucket
+        areas = np.abs((x[previous] - next_x) * (y[start:stop] - y[previous])
+                       - (x[previous] - x[start:stop]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return selected
+
+
+def downsample_pred_values(full_pred_values, max_points, oos_start=None, keep_peaks=5):
+    """
+    Accepts a get_pred_values DataFrame and the number of in-sample points to keep
+    Downsamples the rows before oos_start with LTTB on y (yhat where y is missing),
+    keeping every out-of-sample row, and the keep_peaks highest y and yhat of every year
+    Returns the downsampled DataFrame
+    """
+    df = full_pred_values
+    if oos_start is None:
+        oos_start = df.loc[str(df.index.year.unique()[-1])].index[0]
+    n_in_sample = df.index.searchsorted(oos_start)
+    if n_in_sample <= max_points:
+        return df
+
+    in_sample = df.iloc[:n_in_sample]
+    y = in_sample['y'].fillna(in_sample['yhat']).values
+    x = in_sample.index.values.astype('datetime64[ns]').astype(np.int64)
+    keep = set(lttb_indices(x, y, max_points))
+
+    positions = pd.Series(np.arange(len(df)), index=df.index)
+    years = df.index.year
+    for col in ('y', 'yhat'):
+        peaks = df[col].groupby(years).nlargest(keep_peaks).index.get_level_values(-1)
+        keep.update(positions.loc[peaks].values)
 
-register_matplotlib_converters()
+    keep.update(range(n_in_sample, len(df)))
+    return df.iloc[sorted(keep)]
 
 
-def plot_prediction(full_pred_values, goback_years=None):
+def plot_prediction(full_pred_values, goback_years=None, max_points=None, keep_peaks=5):
     """
     Plots the models's output as blue lines, and actual values as black dots
     Drwas a red vertical line at the point where the out-of-sample predictions start
+    max_points downsamples the in-sample history to about that many points,
+    see downsample_pred_values, the out-of-sample window and yearly peaks are always drawn
     returns matplotlib, figure and axis objects
     """
+    plt = _pyplot()
     df = full_pred_values.copy(deep=True)
     final_year = df.index.year.unique()[-1]
     oos_start = df.loc[str(final_year)].index[0]
@@ -29,6 +109,9 @@ def plot_prediction(full_pred_values, goback_years=None):
         start_year = final_year - goback_years + 1
         df = df.loc[str(start_year) : str(final_year)]
 
+    if max_points:
+        df = downsample_pred_values(df, max_points, oos_start, keep_peaks=keep_peaks)
+
     fig, ax = plt.subplots(figsize=(14, 8))
     ax.plot(df["y"], "ko", markersize=3, label="Actual")
     ax.plot(df["yhat"], color="steelblue", lw=0.5, label="Predicted")
@@ -46,6 +129,7 @@ def plot_prediction(full_pred_values, goback_years=None):
     return fig, ax
 
 def resids_vs_preds_plot(pred_vals):
+    plt = _pyplot()
     fig, ax = plt.subplots(figsize=(12,8))
     ax.scatter(pred_vals[pred_vals['is_forecast'] == 1]['y'].values,
               pred_vals[pred_vals['is_forecast'] == 1]['resid'].values)
@@ -59,6 +143,9 @@ def plot_joint_plot(full_pred_values, goback_years=1):
     """
     
     """
+    _pyplot()
+    import seaborn as sns
+
     axes_titles = {"yhat": "Predicted", "y": "Actual"}
 
     df = full_pred_values.copy(deep=True)
@@ -83,6 +170,11 @@ def residual_plots(full_pred_values, figsize=(14, 14), bins=10, goback_years=1):
     """
     Produce a set of residual diagnosos plots similar to statsmodels tome series analysis
     """
+    plt = _pyplot()
+    from scipy.stats import norm
+    from statsmodels.graphics.gofplots import qqplot
+    from statsmodels.graphics.tsaplots import plot_acf
+
     df = full_pred_values.copy(deep=True)
     final_year = df.index.year.unique()[-1]
     start_year = final_year - goback_years + 1
@@ -122,6 +214,8 @@ def residual_plots(full_pred_values, figsize=(14, 14), bins=10, goback_years=1):
     return fig, axes
 
 def print_residual_stats(predicted_vals, goback_years=1):
+    from statsmodels.stats.diagnostic import acorr_ljungbox
+    from statsmodels.stats.stattools import jarque_bera
                                
     df = predicted_vals.copy(deep=True)
     final_year = df.index.year.unique()[-1]
@@ -144,6 +238,9 @@ def seasonal_plot(df: pd.DataFrame, labels: list, date_format: str,
     If labels is an empty list then no labels attributed to series 
     
     """
+    plt = _pyplot()
+    from matplotlib.dates import DateFormatter
+
     myFmt = DateFormatter(date_format) 
     x = df.index
     seriess = [df[col] for col in df.columns]
@@ -158,3 +255,57 @@ def seasonal_plot(df: pd.DataFrame, labels: list, date_format: str,
 
     return fig, ax1
 
+
+def _use_agg():
+    # Worker processes render off screen
+    import matplotlib
+    matplotlib.use("Agg", force=True)
+
+
+def _render_figure(kind, pred_values, kwargs, path, dpi):
+    """
+    Draws a single figure, saves it to path and closes it
+    Returns the path
+    """
+    plt = _pyplot()
+    if kind == "prediction":
+        fig, _ = plot_prediction(pred_values, **kwargs)
+    elif kind == "joint":
+        fig = plot_joint_plot(pred_values, **kwargs)[0].fig
+    elif kind == "residual":
+        if "resid" not in pred_values.columns:
+            pred_values = pred_values.assign(resid=pred_values["y"].subtract(pred_values["yhat"]))
+        fig, _ = residual_plots(pred_values, **kwargs)
+    else:
+        raise ValueError(f"Unknown figure kind: {kind}")
+    fig.savefig(path, dpi=dpi)
+    plt.close(fig)
+    return path
+
+
+def export_figures(figures, out_dir, n_jobs=None, dpi=100, fmt="png"):
+    """
+    Accepts a dict of {name: (kind, get_pred_values DataFrame, kwargs)},
+    where kind is "prediction", "joint" or "residual", and kwargs go to
+    plot_prediction, plot_joint_plot or residual_plots respectively
+    Saves each figure to out_dir/<name>.<fmt>
+    With n_jobs (as joblib, -1 for all cores) the figures are rendered by worker processes
+    using the Agg backend, otherwise one at a time in this process
+    Returns a dict of {name: path}
+    """
+    out_dir = pathlib.Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = {name: out_dir / f"{name}.{fmt}" for name in figures}
+
+    max_workers = resolve_n_jobs(n_jobs)
+    if max_workers == 1:
+        for name, (kind, pred_values, kwargs) in figures.items():
+            _render_figure(kind, pred_values, kwargs, paths[name], dpi)
+        return paths
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_use_agg) as pool:
+        futures = [pool.submit(_render_figure, kind, pred_values, kwargs, paths[name], dpi)
+                   for name, (kind, pred_values, kwargs) in figures.items()]
+        for future in futures:
+            future.result()
+    return paths
@@ -0,0 +1,24 @@
+import pathlib
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The notebooks import the package as src from the project root
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture
+def daily_peaks():
+    """
+    Six summers of synthetic daily peaks, with temperature and day of week features
+    """
+    rng = np.random.RandomState(0)
+    index = pd.date_range("2010-01-01", "2015-12-31", freq="D")
+    X = pd.DataFrame({"temp": 10 + 15 * np.sin(2 * np.pi * index.dayofyear / 365.25)
+                              + rng.normal(size=len(index)),
+                      "day_of_week": index.dayofweek.astype(float)}, index=index)
+    y = pd.Series(15000 + 300 * X["temp"] + rng.normal(scale=200, size=len(index)),
+                  index=index, name="daily_peak")
+    return X, y
@@ -0,0 +1,73 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.neighbors import KNeighborsRegressor
+
+from src.models.analog import AnalogDayIndex
+
+
+def _days(start, n, seed):
+    rng = np.random.RandomState(seed)
+    X = pd.DataFrame({"temp": rng.normal(25, 5, n), "humidity": rng.uniform(30, 90, n),
+                      "day_of_week": rng.randint(0, 7, n).astype(float)},
+                     index=pd.date_range(start, periods=n, freq="D"))
+    y = pd.Series(rng.normal(0, 300, n), index=X.index)
+    return X, y
+
+
+def _brute_force(index, X, y, weights):
+    # KNeighborsRegressor over every day seen so far, in the scaling fixed at fit
+    scaled = (X[index.features_].values - index.center_) / index.scale_
+    reference = KNeighborsRegressor(index.n_neighbors, weights=weights, algorithm="brute")
+    return reference.fit(scaled, y)
+
+
+@pytest.mark.parametrize("weights", ["uniform", "distance"])
+@pytest.mark.parametrize("algorithm", ["kd_tree", "ball_tree"])
+def test_appended_index_matches_brute_force_knn(weights, algorithm):
+    X, y = _days("2010-01-01", 400, seed=0)
+    X_new, _ = _days("2012-01-01", 50, seed=1)
+    index = AnalogDayIndex(n_neighbors=7, weights=weights, algorithm=algorithm)
+    index.fit(X.iloc[:200], y.iloc[:200])
+    n_indexed = []
+    for start in range(200, 400, 20):
+        index.append(X.iloc[start:start + 20], y.iloc[start:start + 20])
+        n_indexed.append(index.n_indexed_)
+        seen = slice(0, start + 20)
+        reference = _brute_force(index, X.iloc[seen], y.iloc[seen], weights)
+        query = (X_new[index.features_].values - index.center_) / index.scale_
+
+        distances, positions = index.kneighbors(X_new)
+        ref_distances, ref_positions = reference.kneighbors(query)
+        np.testing.assert_allclose(distances, ref_distances)
+        np.testing.assert_array_equal(positions, ref_positions)
+        np.testing.assert_allclose(index.predict(X_new).values, reference.predict(query))
+
+    # Some checks ran with days in the buffer, and some after a rebuild
+    assert n_indexed[0] == 200 and n_indexed[-1] > 200 and len(set(n_indexed)) > 2
+
+
+def test_exact_matches_take_the_weight_and_neighbours_name_the_days():
+    X, y = _days("2010-01-01", 100, seed=2)
+    index = AnalogDayIndex(n_neighbors=5).fit(X.iloc[:80], y.iloc[:80])
+    index.append(X.iloc[80:], y.iloc[80:])
+
+    np.testing.assert_allclose(index.predict(X.iloc[[3, 90]]).values, y.iloc[[3, 90]].values)
+    analogs = index.neighbours(X.iloc[[90]], n_neighbors=3)
+    assert analogs["rank"].tolist() == [1, 2, 3]
+    assert analogs["analog_day"].iloc[0] == X.index[90]
+    assert analogs["distance"].iloc[0] == 0.0
+
+
+def test_pickled_index_answers_as_before():
+    X, y = _days("2010-01-01", 300, seed=3)
+    X_new, _ = _days("2012-01-01", 20, seed=4)
+    index = AnalogDayIndex(n_neighbors=6).fit(X.iloc[:250], y.iloc[:250])
+    index.append(X.iloc[250:], y.iloc[250:])
+
+    restored = pickle.loads(pickle.dumps(index))
+    for expected, actual in zip(index.kneighbors(X_new), restored.kneighbors(X_new)):
+        np.testing.assert_array_equal(expected, actual)
+    pd.testing.assert_series_equal(restored.predict(X_new), index.predict(X_new))
@@ -0,0 +1,43 @@
+import numpy as np
+from scipy.stats import binom
+
+from src.utils.bootstrap import (_binomial_pmf, hit_count_distribution, hit_matrix,
+                                 simulate_hit_counts)
+
+BOUND_PRECISIONS = [0.6, 0.8, 0.4, 0.8, 1.0, 0.6, 0.2, 0.8]
+
+
+def test_hit_matrix_rows_hold_each_years_hits():
+    hits = hit_matrix(BOUND_PRECISIONS)
+    assert hits.shape == (8, 5)
+    np.testing.assert_array_equal(hits.sum(axis=1), [3, 4, 2, 4, 5, 3, 1, 4])
+
+
+def test_binomial_pmf_matches_scipy():
+    rates = np.array([0.0, 0.3, 0.65, 1.0])
+    np.testing.assert_allclose(_binomial_pmf(rates, 5),
+                               binom.pmf(np.arange(6)[np.newaxis, :], 5, rates[:, np.newaxis]),
+                               atol=1e-15)
+
+
+def test_simulation_converges_to_the_binomial():
+    hits = hit_matrix(BOUND_PRECISIONS)
+    counts = simulate_hit_counts(hits, n_trials=400000, seed=0)
+
+    assert counts.sum() == 400000
+    np.testing.assert_allclose(counts / counts.sum(), binom.pmf(np.arange(6), 5, hits.mean()),
+                               atol=3e-3)
+
+
+def test_results_do_not_depend_on_the_number_of_processes():
+    hits = hit_matrix(BOUND_PRECISIONS)
+    serial = simulate_hit_counts(hits, n_trials=25000, chunk_size=10000, seed=3)
+    parallel = simulate_hit_counts(hits, n_trials=25000, chunk_size=10000, seed=3, n_jobs=2)
+    np.testing.assert_array_equal(serial, parallel)
+
+
+def test_distribution_interval_contains_the_simulated_probability():
+    df = hit_count_distribution(hit_matrix(BOUND_PRECISIONS), n_trials=100000, n_boot=2000,
+                                seed=0)
+    np.testing.assert_allclose(df["probability"].sum(), 1.0)
+    assert ((df["lower"] <= df["probability"]) & (df["probability"] <= df["upper"])).all()
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils.utils import batch_bound_precision, bound_precision, top_k_mask
+
+
+def _sorted_bound_precision(y_actual, y_predicted, n_to_check=5):
+    # bound_precision as it was before batch_bound_precision, by sorting each series
+    y_act = pd.Series(np.asarray(y_actual))
+    y_pred = pd.Series(np.asarray(y_predicted))
+    act_dates = set(y_act.sort_values(ascending=False, kind="mergesort").head(n_to_check).index)
+    pred_dates = set(y_pred.sort_values(ascending=False, kind="mergesort").head(n_to_check).index)
+    return len(act_dates.intersection(pred_dates)) / n_to_check
+
+
+@pytest.mark.parametrize("n_to_check", [1, 5, 10])
+def test_batch_matches_sorting_each_row(n_to_check):
+    rng = np.random.RandomState(0)
+    actual = rng.normal(size=(200, 120))
+    # Rounded predictions, so the k-th value is often tied
+    predicted = np.round(actual + rng.normal(scale=0.5, size=actual.shape), 1)
+
+    batch = batch_bound_precision(actual, predicted, n_to_check)
+
+    expected = [_sorted_bound_precision(act, pred, n_to_check)
+                for act, pred in zip(actual, predicted)]
+    np.testing.assert_array_equal(batch, expected)
+
+
+def test_bound_precision_ignores_the_index():
+    index = pd.date_range("2015-06-01", periods=30)
+    y_actual = pd.Series(np.arange(30.0), index=index)
+    y_predicted = pd.Series(np.arange(30.0)[::-1], index=index[::-1])
+
+    assert bound_precision(y_actual, y_predicted) == _sorted_bound_precision(y_actual,
+                                                                             y_predicted)
+    assert bound_precision(y_actual, y_actual) == 1.0
+
+
+def test_a_single_row_is_broadcast():
+    rng = np.random.RandomState(1)
+    actual, predicted = rng.normal(size=60), rng.normal(size=(8, 60))
+
+    np.testing.assert_array_equal(batch_bound_precision(actual, predicted),
+                                  batch_bound_precision(np.tile(actual, (8, 1)), predicted))
+
+
+def test_top_k_mask_ranks_nan_last_and_breaks_ties_by_position():
+    mask = top_k_mask([[3.0, np.nan, 5.0, 3.0, 3.0, 1.0]], 3)
+    assert mask.tolist() == [[True, False, True, True, False, False]]
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from src.data.columnar import read_frame, write_frame
+
+
+def _frame():
+    index = pd.date_range('2018-01-01', periods=48, freq='h', name='date')
+    return pd.DataFrame({'temp': np.linspace(-5, 5, 48),
+                         'rel_hum': np.arange(48.0),
+                         'hour': index.hour.values.astype(np.int64),
+                         'weather': ['Snow', 'Clear'] * 24}, index=index)
+
+
+def _mapping(values):
+    # The np.memmap a view was taken from, if any
+    while values is not None and not isinstance(values, np.memmap):
+        values = values.base
+    return values
+
+
+def test_mapped_columns_are_views_of_the_files(tmp_path):
+    write_frame(_frame(), tmp_path / 'frame')
+
+    df = read_frame(tmp_path / 'frame')
+
+    for position, name in enumerate(['temp', 'rel_hum', 'hour']):
+        values = df[name].values
+        mapping = _mapping(values)
+        assert mapping is not None
+        assert str(mapping.filename) == str(tmp_path / 'frame' / f'col_{position:04d}.npy')
+        assert np.shares_memory(values, mapping)
+        np.testing.assert_array_equal(values, _frame()[name].values)
+    assert list(df['weather']) == list(_frame()['weather'])
+
+
+def test_writes_to_a_mapped_frame_leave_the_files_unchanged(tmp_path):
+    write_frame(_frame(), tmp_path / 'frame')
+
+    df = read_frame(tmp_path / 'frame')
+    df.loc[df.index[0], 'temp'] = 100.0
+
+    assert read_frame(tmp_path / 'frame')['temp'].iloc[0] == -5.0
+
+
+def test_without_mmap_columns_are_in_memory(tmp_path):
+    write_frame(_frame(), tmp_path / 'frame')
+
+    df = read_frame(tmp_path / 'frame', columns=['rel_hum', 'temp'], mmap=False)
+
+    assert list(df.columns) == ['rel_hum', 'temp']
+    assert _mapping(df['temp'].values) is None
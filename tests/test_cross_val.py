@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+import pytest
+from sklearn.linear_model import Ridge
+
+from src.utils.cache import FoldCache
+from src.utils.utils import RollingAnnualTimeSeriesSplit, resolve_n_jobs, run_cross_val
+
+
+def test_resolve_n_jobs_follows_joblib():
+    assert resolve_n_jobs(None) == 1
+    assert resolve_n_jobs(3) == 3
+    assert resolve_n_jobs(-1) == os.cpu_count()
+    assert resolve_n_jobs(-2) == max(os.cpu_count() - 1, 1)
+    with pytest.raises(ValueError):
+        resolve_n_jobs(0)
+
+
+def test_parallel_run_leaves_pipeline_fitted_on_last_fold(daily_peaks):
+    X, y = daily_peaks
+    splitter = RollingAnnualTimeSeriesSplit(n_splits=3, goback_years=2)
+
+    serial, parallel = Ridge(), Ridge()
+    serial_scores = run_cross_val(X, y, splitter, serial)
+    parallel_scores = run_cross_val(X, y, splitter, parallel, n_jobs=2)
+
+    assert parallel_scores == serial_scores
+    np.testing.assert_array_equal(parallel.coef_, serial.coef_)
+
+
+@pytest.mark.parametrize("n_jobs", [None, 2])
+def test_warm_cache_leaves_pipeline_fitted_on_last_fold(daily_peaks, tmp_path, n_jobs):
+    X, y = daily_peaks
+    splitter = RollingAnnualTimeSeriesSplit(n_splits=3, goback_years=2)
+    cache = FoldCache(tmp_path)
+
+    cold, warm = Ridge(), Ridge()
+    cold_scores = run_cross_val(X, y, splitter, cold, cache=cache)
+    warm_scores = run_cross_val(X, y, splitter, warm, n_jobs=n_jobs, cache=cache)
+
+    assert warm_scores == cold_scores
+    np.testing.assert_array_equal(warm.coef_, cold.coef_)
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+from statsmodels.stats.diagnostic import acorr_ljungbox
+from statsmodels.stats.stattools import jarque_bera as sm_jarque_bera
+from statsmodels.tsa.stattools import acf as sm_acf
+
+from src.utils.diagnostics import (batch_acf, jarque_bera, ljung_box, residual_diagnostics,
+                                   residual_matrix)
+
+
+def _pred_values():
+    # AR(1) residuals of different lengths, in the final year of each frame
+    rng = np.random.RandomState(0)
+    frames = {}
+    for name, (n_days, phi) in {('sarimax', 0): (120, 0.6), ('sarimax', 1): (95, 0.0),
+                                ('prophet', 0): (60, -0.3)}.items():
+        index = pd.date_range('2015-06-01', periods=n_days)
+        noise = rng.standard_t(5, size=n_days)
+        resid = np.empty(n_days)
+        resid[0] = noise[0]
+        for day in range(1, n_days):
+            resid[day] = phi * resid[day - 1] + noise[day]
+        y = 15000 + rng.normal(scale=500, size=n_days)
+        frames[name] = pd.DataFrame({'y': y, 'yhat': y - 100 * resid}, index=index)
+    return frames
+
+
+def test_statistics_match_statsmodels():
+    pred_values = _pred_values()
+    names, matrix, lengths = residual_matrix(pred_values)
+    acf = batch_acf(matrix, lengths, nlags=10)
+    q_stats, q_pvalues = ljung_box(acf, lengths, lags=10)
+    jb_stats, jb_pvalues, skew, kurtosis = jarque_bera(matrix, lengths)
+
+    for row, name in enumerate(names):
+        resids = matrix[row, :lengths[row]]
+        np.testing.assert_allclose(acf[row], sm_acf(resids, nlags=10, fft=True), atol=1e-12)
+        reference = acorr_ljungbox(resids, lags=10, return_df=True)
+        np.testing.assert_allclose(q_stats[row], reference['lb_stat'], rtol=1e-10)
+        np.testing.assert_allclose(q_pvalues[row], reference['lb_pvalue'], rtol=1e-8)
+        np.testing.assert_allclose([jb_stats[row], jb_pvalues[row], skew[row], kurtosis[row]],
+                                   sm_jarque_bera(resids), rtol=1e-10)
+
+
+def test_residual_diagnostics_has_one_row_per_series():
+    pred_values = _pred_values()
+    table = residual_diagnostics(pred_values)
+
+    assert list(table.index) == list(pred_values)
+    assert table['n'].tolist() == [120, 95, 60]
+    resids = pred_values[('prophet', 0)]['y'] - pred_values[('prophet', 0)]['yhat']
+    row = table.loc[('prophet', 0)]
+    np.testing.assert_allclose([row['bias'], row['mae'], row['std']],
+                               [resids.mean(), resids.abs().mean(), resids.std()])
+    assert table.loc[('sarimax', 0), 'acf_1'] > 0.4
@@ -0,0 +1,135 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features.features import (DAILY_FEATURES, MAGNUS_B, MAGNUS_C, CyclicalEncoder,
+                                   CyclicalToCycle, DailyFeatureAggregator, DewPoint, Humidex,
+                                   WindChill, daily_features, dew_point, humidex, wind_chill)
+
+
+@pytest.fixture
+def hourly():
+    rng = np.random.RandomState(0)
+    index = pd.date_range('2018-06-01', '2018-06-20 23:00', freq='h')
+    df = pd.DataFrame(np.round(rng.normal(20, 5, size=(len(index), len(DAILY_FEATURES))), 0),
+                      index=index, columns=DAILY_FEATURES)
+    # Missing hours, and a day with no temp at all
+    df.iloc[rng.choice(len(df), 40, replace=False), 0] = np.nan
+    df.loc['2018-06-05', 'temp'] = np.nan
+    return df
+
+
+def test_chunked_updates_with_overlap_match_the_batch(hourly):
+    aggregator = DailyFeatureAggregator()
+    # Chunks of 30 hours that start 6 hours before the previous chunk ended
+    for start in range(0, len(hourly), 24):
+        aggregator.update(hourly.iloc[max(start - 6, 0):start + 24])
+
+    pd.testing.assert_frame_equal(aggregator.daily_features(), daily_features(hourly),
+                                  check_freq=False)
+
+
+def test_resent_hours_replace_the_earlier_rows(hourly):
+    aggregator = DailyFeatureAggregator()
+    revised = hourly.copy()
+    revised.loc['2018-06-10 12:00':'2018-06-11 03:00', 'temp'] += 15
+
+    aggregator.update(hourly.iloc[::-1])
+    daily = aggregator.update(revised.loc['2018-06-10 12:00':'2018-06-11 03:00'])
+
+    assert list(daily.index) == list(pd.to_datetime(['2018-06-10', '2018-06-11']))
+    pd.testing.assert_frame_equal(aggregator.daily_features(), daily_features(revised),
+                                  check_freq=False)
+
+
+def _calendar():
+    index = pd.date_range('2018-01-01', periods=500, freq='h')
+    return pd.DataFrame({'temp': np.linspace(-5, 25, 500),
+                         'hour_of_day': index.hour,
+                         'day_of_week': index.dayofweek.astype(float),
+                         'hmdxx_max_hour': np.linspace(0, 23.5, 500)}, index=index)
+
+
+def test_cyclical_encoder_matches_chained_cyclical_to_cycle():
+    X = _calendar()
+    cycles = {'hour_of_day': 24, 'day_of_week': 7, 'hmdxx_max_hour': 24}
+
+    expected = X
+    for name, period in cycles.items():
+        expected = CyclicalToCycle(name, period).transform(expected)
+    encoded = CyclicalEncoder(cycles).fit_transform(X)
+
+    pd.testing.assert_frame_equal(encoded, expected, check_exact=False, rtol=1e-12, atol=1e-12)
+    assert list(X.columns) == ['temp', 'hour_of_day', 'day_of_week', 'hmdxx_max_hour']
+
+
+def test_cyclical_encoder_arrays_match_frames():
+    X = _calendar()
+    encoder = CyclicalEncoder({1: 24, 2: 7}, dtype=np.float32).fit(X.values)
+    encoded = encoder.transform(X.values)
+    expected = CyclicalEncoder({'hour_of_day': 24, 'day_of_week': 7},
+                               dtype=np.float32).fit_transform(X)
+
+    assert encoded.dtype == np.float32
+    np.testing.assert_allclose(encoded, expected.values.astype(float), rtol=1e-6, atol=1e-6)
+    assert list(encoder.get_feature_names_out()) == ['x0', 'x3', 'sin_x1', 'cos_x1',
+                                                     'sin_x2', 'cos_x2']
+
+
+def _scalar_humidex(temp, dew_point_temp):
+    vapour_pressure = 6.11 * math.exp(5417.7530 * (1 / 273.16 - 1 / (273.15 + dew_point_temp)))
+    # Environment Canada publishes the factor rounded to 0.5555
+    return temp + 0.5555 * (vapour_pressure - 10)
+
+
+def _scalar_wind_chill(temp, wind_speed):
+    if temp > 10:
+        return np.nan
+    if wind_speed >= 5:
+        return (13.12 + 0.6215 * temp - 11.37 * wind_speed ** 0.16
+                + 0.3965 * temp * wind_speed ** 0.16)
+    return temp + (-1.59 + 0.1345 * temp) / 5 * wind_speed
+
+
+def test_weather_indices_match_the_published_formulas():
+    rng = np.random.RandomState(0)
+    temp = rng.uniform(-30, 35, 500)
+    dew = temp - rng.uniform(0, 15, 500)
+    wind = rng.uniform(0, 60, 500)
+
+    np.testing.assert_allclose(humidex(temp, dew),
+                               [_scalar_humidex(t, d) for t, d in zip(temp, dew)], atol=0.02)
+    np.testing.assert_allclose(wind_chill(temp, wind),
+                               [_scalar_wind_chill(t, w) for t, w in zip(temp, wind)])
+    # Environment Canada's tables: humidex 34 at 30 C with a 15 C dew point,
+    # wind chill -33 at -20 C in a 30 km/h wind
+    assert round(float(humidex(30, 15))) == 34
+    assert round(float(wind_chill(-20, 30))) == -33
+
+
+def test_dew_point_inverts_the_magnus_humidity():
+    temp = np.linspace(-20, 35, 50)
+    dew = temp - np.linspace(0, 12, 50)
+    magnus = lambda t: np.exp(MAGNUS_B * t / (MAGNUS_C + t))
+    rel_hum = 100 * magnus(dew) / magnus(temp)
+
+    np.testing.assert_allclose(dew_point(temp, rel_hum), dew, atol=1e-10)
+    assert np.isnan(dew_point([20.0, np.nan], [0.0, 50.0])).all()
+
+
+def test_transformers_only_fill_missing_values():
+    X = pd.DataFrame({'temp': [25.0, 30.0, 5.0, np.nan], 'rel_hum': [60.0, 50.0, 80.0, 70.0],
+                      'wind_speed': [10.0, 10.0, 20.0, 20.0],
+                      'dew_point_temp': [16.7, np.nan, np.nan, np.nan],
+                      'hmdx': [99.0, np.nan, np.nan, np.nan], 'wind_chill': np.nan})
+
+    filled = WindChill().transform(Humidex().transform(DewPoint().transform(X)))
+
+    assert filled['dew_point_temp'].iloc[0] == 16.7 and filled['hmdx'].iloc[0] == 99.0
+    assert filled['dew_point_temp'].iloc[1] == dew_point(30.0, 50.0)
+    assert filled['hmdx'].iloc[1] == humidex(30.0, dew_point(30.0, 50.0))
+    assert filled[['dew_point_temp', 'hmdx', 'wind_chill']].iloc[3].isna().all()
+    assert filled['wind_chill'].iloc[:2].isna().all() and filled['wind_chill'].iloc[2] < 5.0
+    assert X['hmdx'].isna().sum() == 3
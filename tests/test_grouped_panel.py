@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import Ridge
+
+from src.utils.utils import (GroupedPanel, RollingAnnualTimeSeriesSplit, run_cross_val,
+                             run_data_split_cross_val, temporal_split)
+
+
+def _old_temporal_split(X, y, splitter_col="day_of_week"):
+    # temporal_split before GroupedPanel: every split copied out of X with a boolean mask
+    X_splits, y_splits = [], []
+    Xt = X.copy(deep=True)
+    for split_flag in sorted(Xt[splitter_col].unique()):
+        X_split = Xt[Xt[splitter_col] == split_flag]
+        X_splits.append(X_split)
+        y_splits.append(y.loc[X_split.index])
+    return X_splits, y_splits
+
+
+def _old_run_data_split_cross_val(X, y, data_splitter_col, cv_splitter, model, scoring):
+    scores_dict = {}
+    X_splits, y_splits = _old_temporal_split(X, y, data_splitter_col)
+    for indx_splitter, X_split, y_split in zip(sorted(X[data_splitter_col].unique()),
+                                               X_splits, y_splits):
+        scores_dict[indx_splitter] = run_cross_val(X_split, y_split, cv_splitter, model,
+                                                   scoring=scoring)
+    return scores_dict
+
+
+@pytest.fixture
+def panel_data(daily_peaks):
+    X, y = daily_peaks
+    # The day of week groups interleave, so no group is a contiguous block of X
+    return X.loc["2011":], y.loc["2011":]
+
+
+def test_temporal_split_matches_the_old_copies(panel_data):
+    X, y = panel_data
+    for new, old in zip(*[temporal_split(X, y), _old_temporal_split(X, y)]):
+        for new_frame, old_frame in zip(new, old):
+            pd.testing.assert_frame_equal(pd.DataFrame(new_frame), pd.DataFrame(old_frame))
+
+
+@pytest.mark.parametrize("n_jobs", [None, 2])
+def test_scores_match_the_old_per_group_loop(panel_data, n_jobs):
+    X, y = panel_data
+    splitter = RollingAnnualTimeSeriesSplit(n_splits=2, goback_years=2)
+    scoring = ["bound_precision", "mae"]
+
+    new = run_data_split_cross_val(X, y, "day_of_week", splitter, Ridge(), scoring=scoring,
+                                   n_jobs=n_jobs)
+    old = _old_run_data_split_cross_val(X, y, "day_of_week", splitter, Ridge(), scoring)
+
+    assert list(new) == list(old) == sorted(X["day_of_week"].unique())
+    assert new == old
+
+
+def test_panel_positions_keep_each_group_in_time_order(panel_data):
+    X, y = panel_data
+    panel = GroupedPanel(X, y, "day_of_week")
+
+    assert sum(len(indices) for indices in panel.indices.values()) == len(X)
+    for group in panel:
+        assert panel.X(group).index.is_monotonic_increasing
+        assert (panel.X(group)["day_of_week"] == group).all()
@@ -0,0 +1,41 @@
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+PROJECT_DIR = pathlib.Path(__file__).resolve().parents[1]
+
+# The heavy packages check is what catches an eager import coming back. The time budget
+# only catches gross regressions: pandas and numpy take about 0.3 s, and it is set far above
+# that so that a loaded CI machine doesn't fail it
+IMPORT_BUDGET_SECONDS = 5.0
+HEAVY_PACKAGES = ["sklearn", "scipy", "statsmodels", "matplotlib", "seaborn", "fbprophet",
+                  "prophet"]
+
+
+def import_profile(module):
+    """
+    Imports module in a fresh interpreter with -X importtime
+    Returns its cumulative import time in seconds, and the heavy packages it loaded
+    """
+    code = (f"import sys; import {module}; "
+            f"print(','.join(p for p in {HEAVY_PACKAGES!r} if p in sys.modules))")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=PROJECT_DIR,
+                            capture_output=True, text=True, check=True)
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative_us, name = line.split("|")
+            if cumulative_us.strip().isdigit():
+                cumulative[name.strip()] = int(cumulative_us) / 1e6
+    loaded = [package for package in result.stdout.strip().split(",") if package]
+    return cumulative[module], loaded
+
+
+@pytest.mark.parametrize("module", ["src.utils", "src.utils.utils", "src.models.models",
+                                    "src.visualization.visualize"])
+def test_import_stays_within_budget(module):
+    seconds, loaded = import_profile(module)
+    assert loaded == []
+    assert seconds < IMPORT_BUDGET_SECONDS
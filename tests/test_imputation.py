@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+from src.features.imputation import AnalogImputer, missing_runs
+
+
+def _hourly(seed=0):
+    # Each day's demand encodes the day, so a filled hour names the day it came from
+    rng = np.random.RandomState(seed)
+    days = pd.date_range("2014-01-01", "2016-12-31", freq="D")
+    hours = pd.date_range(days[0], periods=24 * len(days), freq="h")
+    daily_temp = (10 - 15 * np.cos(2 * np.pi * days.dayofyear.values / 365.25)
+                  + 8 * rng.standard_normal(len(days)))
+    hourly = pd.DataFrame({"temp": np.repeat(daily_temp, 24) + np.tile(np.arange(24.0), len(days)),
+                           "ont_demand": (1000 * np.repeat(np.arange(len(days)), 24)
+                                          + np.tile(np.arange(24.0), len(days)))},
+                          index=hours)
+    return hourly, days
+
+
+def _plant(hourly, donor, gap, n_days):
+    # The donor window's temperature is the gap's, so the donor has a perfect match
+    for offset in range(n_days):
+        day, donor_day = gap + pd.Timedelta(days=offset), donor + pd.Timedelta(days=offset)
+        hourly.loc[str(donor_day.date()), "temp"] = hourly.loc[str(day.date()), "temp"].values
+    hourly.loc[gap:gap + pd.Timedelta(hours=24 * n_days - 1), "ont_demand"] = np.nan
+
+
+def _source_days(filled, days):
+    return [days[int(value // 1000)] for value in filled["ont_demand"].values[::24]]
+
+
+def _brute_force_analog(imputer, start, n_days):
+    best, best_score = None, np.inf
+    days = imputer.days_
+    for donor in range(start % 7, len(days) - n_days + 1, 7):
+        if abs(donor - start) < n_days or np.isnan(imputer.values_[donor:donor + n_days]).any():
+            continue
+        season_gap = abs(days[donor].dayofyear - days[start].dayofyear)
+        if min(season_gap, 365 - season_gap) > imputer.season_days:
+            continue
+        score = (abs(np.nanmean(imputer.daily_match_[donor:donor + n_days])
+                     - np.nanmean(imputer.daily_match_[start:start + n_days]))
+                 + imputer.time_weight * abs(donor - start) / 365.25)
+        if score < best_score:
+            best, best_score = donor, score
+    return best, best_score
+
+
+def test_missing_runs():
+    assert missing_runs([False, True, True, False, True]) == [(1, 2), (4, 1)]
+    assert missing_runs([True, False, False]) == [(0, 1)]
+    assert missing_runs(np.zeros(5, dtype=bool)) == []
+
+
+def test_known_gap_is_filled_from_the_planted_analog():
+    hourly, days = _hourly()
+    gap, donor = pd.Timestamp("2015-07-14"), pd.Timestamp("2015-07-28")
+    _plant(hourly, donor, gap, n_days=3)
+    hourly.loc["2015-08-20 05:00":"2015-08-20 07:00", "ont_demand"] = np.nan
+
+    imputer = AnalogImputer(["ont_demand"]).fit(hourly)
+    filled = imputer.transform(hourly)
+
+    window = filled.loc["2015-07-14":"2015-07-16"]
+    assert _source_days(window, days) == list(pd.date_range(donor, periods=3))
+    np.testing.assert_array_equal(window["ont_demand"].values % 1000, np.tile(np.arange(24), 3))
+    assert imputer.imputations_[0]["donor_start"] == donor
+    assert imputer.imputations_[0]["score"] == imputer.time_weight * 14 / 365.25
+    # A partly missing day only has its missing hours filled
+    partial = filled.loc["2015-08-20"]
+    assert partial["ont_demand"].isna().sum() == 0
+    assert (partial["ont_demand"].values // 1000 != days.get_loc("2015-08-20")).sum() == 3
+    observed = hourly["ont_demand"].notna()
+    pd.testing.assert_frame_equal(filled[observed], hourly[observed])
+
+
+def test_find_analog_matches_a_brute_force_search():
+    hourly, days = _hourly(seed=1)
+    hourly.loc["2015-03-02":"2015-03-05", "ont_demand"] = np.nan
+    hourly.loc["2016-10-10":"2016-10-10 10:00", "temp"] = np.nan
+    imputer = AnalogImputer(["ont_demand"], time_weight=2.0).fit(hourly)
+
+    for gap, n_days in [("2015-03-02", 4), ("2016-10-09", 2), ("2014-01-02", 1),
+                        ("2016-12-30", 2)]:
+        start = days.get_loc(gap)
+        donor, score = imputer.find_analog(start, n_days)
+        expected_donor, expected_score = _brute_force_analog(imputer, start, n_days)
+        assert donor == expected_donor
+        np.testing.assert_allclose(score, expected_score)
+
+
+def test_holidays_are_lined_up_with_the_donors_holidays():
+    hourly, days = _hourly(seed=2)
+    gap, donor = pd.Timestamp("2015-06-30"), pd.Timestamp("2014-07-01")
+    _plant(hourly, donor, gap, n_days=3)
+    canada_day = pd.to_datetime(["2014-07-01", "2015-07-01", "2016-07-01"])
+    holidays = pd.Series("Canada Day", index=canada_day)
+
+    imputer = AnalogImputer(["ont_demand"], holidays=holidays, time_weight=0.0).fit(hourly)
+    filled = imputer.transform(hourly)
+
+    # Canada Day is filled from Canada Day, and the day before it, whose donor is the
+    # holiday, from the nearest plain Tuesday
+    expected = pd.to_datetime(["2014-06-24", "2014-07-01", "2014-07-03"])
+    assert list(imputer.imputations_[0]["donor_days"]) == list(expected)
+    assert _source_days(filled.loc["2015-06-30":"2015-07-02"], days) == list(expected)
+
+
+def test_days_after_the_fitted_history_are_appended_and_filled():
+    hourly, days = _hourly(seed=3)
+    gap, donor = pd.Timestamp("2016-08-09"), pd.Timestamp("2016-08-02")
+    _plant(hourly, donor, gap, n_days=2)
+
+    imputer = AnalogImputer(["ont_demand"]).fit(hourly.loc[:"2015-12-31"])
+    filled = imputer.transform(hourly.loc["2016-07-01":"2016-08-31"])
+
+    assert imputer.days_[-1] == pd.Timestamp("2016-08-31")
+    assert _source_days(filled.loc["2016-08-09":"2016-08-10"], days) == list(
+        pd.date_range(donor, periods=2))
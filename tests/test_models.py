@@ -0,0 +1,87 @@
+import importlib.util
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models import estimators
+from src.models.models import SK_Prophet, SK_SARIMAX
+
+requires_prophet = pytest.mark.skipif(
+    not any(importlib.util.find_spec(name) for name in ("fbprophet", "prophet")),
+    reason="Prophet is not installed")
+
+
+@requires_prophet
+def test_point_forecast_mode_matches_full_predict_columns(daily_peaks):
+    X, y = daily_peaks
+    X, y = X.loc["2015", ["temp"]], y.loc["2015"]
+    X_train, y_train, X_test = X.iloc[:-30], y.iloc[:-30], X.iloc[-30:]
+
+    full = SK_Prophet(regressors={"temp": ()})
+    point = SK_Prophet(regressors={"temp": ()}, point_forecast_only=True)
+    full.fit(X_train, y_train)
+    point.fit(X_train, y_train)
+
+    pd.testing.assert_series_equal(point.predict(X_test), full.predict(X_test))
+    full_values, point_values = full.get_pred_values(), point.get_pred_values()
+    assert list(point_values.columns) == list(full_values.columns)
+    assert point_values["yhat_lower"].isna().all()
+    np.testing.assert_array_equal(point_values["yhat"], full_values["yhat"])
+
+
+def _sarimax_fits(X, y, update_mode):
+    model = SK_SARIMAX(order=(1, 0, 0), seasonal_order=(0, 0, 0, 0), warm_start=True,
+                       update_mode=update_mode)
+    model.fit(X.iloc[:-30], y.iloc[:-30])
+    model.fit(X, y)
+    return model
+
+
+@pytest.mark.parametrize("update_mode", ["append", "refilter"])
+def test_update_modes_keep_the_parameters(daily_peaks, update_mode):
+    X, y = daily_peaks
+    X, y = X.loc["2015", ["temp"]], y.loc["2015"]
+
+    model = _sarimax_fits(X, y, update_mode)
+    refiltered = model.results.model.clone(y, exog=X).filter(model.results.params)
+
+    assert [fit["mode"] for fit in model.fit_history_] == ["fit", update_mode]
+    np.testing.assert_allclose(model.results.filtered_state, refiltered.filtered_state)
+
+
+@pytest.mark.parametrize("update_mode", ["append", "refilter"])
+def test_update_modes_fall_back_to_a_fit_before_statsmodels_0_11(daily_peaks, monkeypatch,
+                                                                  update_mode):
+    X, y = daily_peaks
+    X, y = X.loc["2015", ["temp"]], y.loc["2015"]
+    monkeypatch.setattr(estimators, "_statsmodels_version", lambda: (0, 10))
+
+    model = _sarimax_fits(X, y, update_mode)
+
+    assert [fit["mode"] for fit in model.fit_history_] == ["fit", "warm"]
+
+
+def test_fourier_mode_matches_sarimax_with_explicit_terms(daily_peaks):
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+    X, y = daily_peaks
+    X, y = X.loc["2014":"2015", ["temp"]], y.loc["2014":"2015"]
+    X_train, y_train, X_test = X.iloc[:-30], y.iloc[:-30], X.iloc[-30:]
+    period, order = 365.25, 2
+
+    model = SK_SARIMAX(order=(1, 0, 0), seasonal_order=(1, 0, 0, period), fourier_order=order)
+    model.fit(X_train, y_train)
+    predicted = model.predict(X_test)
+
+    steps = np.arange(len(X))[:, np.newaxis]
+    angles = 2 * np.pi * np.arange(1, order + 1) * steps / period
+    terms = pd.DataFrame(np.hstack([np.sin(angles), np.cos(angles)]), index=X.index,
+                         columns=["s1", "s2", "c1", "c2"])
+    exog = pd.concat([X, terms], axis=1)
+    reference = SARIMAX(y_train, exog=exog.iloc[:-30], order=(1, 0, 0), trend="c").fit(disp=False)
+
+    assert model.results.model.seasonal_periods in (0, None)
+    np.testing.assert_allclose(model.results.params.values, reference.params.values)
+    np.testing.assert_allclose(predicted.values,
+                               reference.forecast(30, exog=exog.iloc[-30:]).values)
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import norm
+
+from src.utils.peaks import interval_sigma, top_k_probability
+
+
+def _forecast(yhat, sigma, start="2018-07-01"):
+    yhat = np.asarray(yhat, dtype=float)
+    half_width = norm.ppf(0.975) * np.asarray(sigma, dtype=float)
+    return pd.DataFrame({"yhat": yhat, "yhat_lower": yhat - half_width,
+                         "yhat_upper": yhat + half_width, "is_forecast": 1},
+                        index=pd.date_range(start, periods=len(yhat), freq="D"))
+
+
+def _season(n_days=40, seed=0):
+    rng = np.random.RandomState(seed)
+    return _forecast(20000 + 1500 * rng.standard_normal(n_days), rng.uniform(300, 900, n_days))
+
+
+def test_interval_sigma_inverts_a_normal_interval():
+    forecast = _forecast([100.0, 200.0], [10.0, 0.0])
+    forecast.loc[forecast.index[1], ["yhat_lower", "yhat_upper"]] = np.nan
+
+    np.testing.assert_allclose(interval_sigma(forecast).values, [10.0, 0.0])
+    lower, upper = norm.interval(0.8, loc=100.0, scale=7.0)
+    np.testing.assert_allclose(interval_sigma(pd.DataFrame({"yhat_lower": [lower],
+                                                            "yhat_upper": [upper]}),
+                                              alpha=0.2).values, [7.0])
+
+
+@pytest.mark.parametrize("k", [1, 5, 12])
+def test_probabilities_sum_to_k(k):
+    forecast = _season()
+    observed = pd.Series([21000.0, 18000.0], index=pd.date_range("2018-06-29", periods=2))
+
+    probabilities = top_k_probability(forecast, observed, k=k, n_sims=5000, rho=0.5, seed=0)
+
+    assert probabilities["probability"].sum() == pytest.approx(k)
+    assert probabilities["probability"].between(0, 1).all()
+    assert probabilities["is_forecast"].tolist() == [0, 0] + [1] * 40
+    assert list(probabilities.index) == list(observed.index) + list(forecast.index)
+
+
+def test_two_days_match_the_normal_difference():
+    # P(first day is the peak) = P(A - B > 0), with A - B normal
+    forecast = _forecast([100.0, 98.0], [3.0, 2.0])
+    for rho in (0.0, 0.6):
+        probabilities = top_k_probability(forecast, k=1, n_sims=200000, rho=rho, seed=1)
+        sd = np.sqrt(3.0 ** 2 + 2.0 ** 2 - 2 * rho * 3.0 * 2.0)
+        assert probabilities["probability"].iloc[0] == pytest.approx(norm.cdf(2.0 / sd),
+                                                                     abs=0.005)
+
+
+def test_observed_days_and_point_forecasts():
+    forecast = _forecast([10.0, 30.0, 20.0, 40.0], [0.0] * 4)
+    observed = pd.Series([35.0, 5.0], index=pd.date_range("2018-06-29", periods=2))
+
+    probabilities = top_k_probability(forecast, observed, k=2, n_sims=100, seed=0)
+
+    assert probabilities["probability"].tolist() == [1.0, 0.0, 0.0, 0.0, 0.0, 1.0]
+    assert probabilities["y"].iloc[:2].tolist() == [35.0, 5.0]
+    assert probabilities["yhat"].iloc[2:].tolist() == [10.0, 30.0, 20.0, 40.0]
+
+
+def test_forecast_rows_already_observed_are_not_simulated():
+    forecast = _season(n_days=10)
+    observed = pd.Series([30000.0], index=forecast.index[:1])
+
+    probabilities = top_k_probability(forecast, observed, k=1, n_sims=1000, seed=0)
+
+    assert len(probabilities) == 10
+    assert probabilities["probability"].tolist() == [1.0] + [0.0] * 9
+
+
+def test_seeded_runs_repeat_and_chunking_does_not_bias_them():
+    forecast = _season()
+    kwargs = dict(k=5, n_sims=40000, rho=0.3)
+
+    one_chunk = top_k_probability(forecast, memory_mb=64, seed=2, **kwargs)
+    pd.testing.assert_frame_equal(one_chunk, top_k_probability(forecast, memory_mb=64, seed=2,
+                                                               **kwargs))
+    # About 200 simulations per chunk
+    chunked = top_k_probability(forecast, memory_mb=0.5, seed=2, **kwargs)
+    np.testing.assert_allclose(chunked["probability"], one_chunk["probability"], atol=0.015)
+
+
+def test_weighted_frames_draw_whole_seasons_from_one_model():
+    low, high = _season(seed=3), _season(seed=4)
+    kwargs = dict(k=3, n_sims=20000, seed=5)
+
+    only_low = top_k_probability([low, high], weights=[1, 0], **kwargs)
+    pd.testing.assert_frame_equal(only_low, top_k_probability(low, **kwargs))
+
+    mixed = top_k_probability([low, high], weights=[1, 3], **kwargs)
+    expected = (top_k_probability(low, **kwargs)["probability"]
+                + 3 * top_k_probability(high, **kwargs)["probability"]) / 4
+    np.testing.assert_allclose(mixed["probability"], expected, atol=0.02)
+    np.testing.assert_allclose(mixed["yhat"], (low["yhat"] + 3 * high["yhat"]) / 4)
+
+    with pytest.raises(ValueError):
+        top_k_probability([low, high.iloc[1:]])
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import Ridge
+
+from src.models.registry import ModelRegistry
+from src.utils.utils import temporal_split
+
+
+def test_group_keys_round_trip(tmp_path):
+    index = pd.date_range("2015-01-01", periods=70, freq="D")
+    X = pd.DataFrame({"temp": np.arange(70.0), "day_of_week": index.dayofweek.astype(float)},
+                     index=index)
+    y = pd.Series(2 * X["temp"].values, index=index, name="daily_peak")
+    X_splits, y_splits = temporal_split(X, y, "day_of_week")
+    keys = sorted(X["day_of_week"].unique())
+    models = {key: Ridge().fit(X_split, y_split)
+              for key, X_split, y_split in zip(keys, X_splits, y_splits)}
+
+    registry = ModelRegistry(tmp_path)
+    registry.save_groups("ridge", models)
+    loaded = ModelRegistry(tmp_path).load_groups("ridge")
+
+    assert list(loaded) == keys
+    assert all(isinstance(key, float) for key in loaded)
+    assert loaded[keys[0]].coef_.tolist() == models[keys[0]].coef_.tolist()
+
+
+def test_groups_with_the_same_name_are_rejected(tmp_path):
+    registry = ModelRegistry(tmp_path)
+    registry.save("ridge", Ridge(), group=0)
+    with pytest.raises(ValueError):
+        registry.save("ridge", Ridge(), group="0")
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils.results import ResultsStore
+from src.utils.utils import save_run_results
+
+
+def _run(offset=0.0):
+    return {'train': {'mae': [1.0, 2.0, 3.0], 'rmse': [1.5, 2.5, 3.5]},
+            'test': {'mae': [10.0 + offset, 20.0, 30.0], 'rmse': [15.0, 25.0, 35.0]}}
+
+
+@pytest.fixture
+def X():
+    return pd.DataFrame({'temp': 0.0}, index=pd.date_range('2010-01-01', '2015-12-31'))
+
+
+def _legacy_csv(path):
+    # The layout the CSV only save_run_results wrote
+    columns = pd.MultiIndex.from_product([['Baseline', 'Prophet'], ['mae', 'bound_precision']])
+    df = pd.DataFrame(np.arange(24.0).reshape(6, 4), index=range(2008, 2014), columns=columns)
+    df.iloc[0, 2] = np.nan
+    df.to_csv(path)
+    return pd.read_csv(path, index_col=0, header=[0, 1])
+
+
+def test_save_run_results_appends_to_a_store(X, tmp_path):
+    store = ResultsStore(tmp_path / 'results.db')
+
+    save_run_results(X, 3, 'Baseline', _run(), store)
+    save_run_results(X, 3, 'Prophet', _run(offset=5.0), store)
+    full_df = save_run_results(X, 3, 'Baseline', _run(offset=1.0), tmp_path / 'results.db')
+
+    assert len(store.query(latest=False)) == 36
+    assert list(full_df.index) == [2013, 2014, 2015]
+    assert list(full_df.columns) == [('Baseline', 'mae'), ('Baseline', 'rmse'),
+                                     ('Prophet', 'mae'), ('Prophet', 'rmse')]
+
+
+def test_a_reused_model_name_replaces_the_earlier_run(X, tmp_path):
+    csv_path = tmp_path / 'results.csv'
+    save_run_results(X, 3, 'Baseline', _run(), csv_path)
+    full_df = save_run_results(X, 3, 'Baseline', _run(offset=1.0), csv_path)
+
+    assert full_df[('Baseline', 'mae')].tolist() == [11.0, 20.0, 30.0]
+    exported = pd.read_csv(csv_path, index_col=0, header=[0, 1])
+    assert exported[('Baseline', 'mae')].tolist() == [11.0, 20.0, 30.0]
+    history = ResultsStore(tmp_path / 'results.db').query(split='test', models=['Baseline'],
+                                                          metrics=['mae'], fold_years=[2013],
+                                                          latest=False)
+    assert history['value'].tolist() == [10.0, 11.0]
+    assert [path.name for path in tmp_path.iterdir() if path.suffix == '.tmp'] == []
+
+
+def test_csv_path_is_imported_then_exported(X, tmp_path):
+    csv_path = tmp_path / 'results.csv'
+    original = _legacy_csv(csv_path)
+
+    full_df = save_run_results(X, 3, 'New Model', _run(), csv_path)
+
+    assert (tmp_path / 'results.db').exists()
+    exported = pd.read_csv(csv_path, index_col=0, header=[0, 1])
+    assert list(exported.columns) == list(original.columns) + [('New Model', 'mae'),
+                                                               ('New Model', 'rmse')]
+    np.testing.assert_allclose(exported.loc[original.index, original.columns].values,
+                               original.values)
+    assert exported.loc[2013:, ('New Model', 'mae')].tolist() == [10.0, 20.0, 30.0]
+    pd.testing.assert_frame_equal(full_df, exported, check_dtype=False, check_names=False)
@@ -0,0 +1,45 @@
+import json
+
+import pytest
+from sklearn.linear_model import Ridge
+
+from src.utils.search import successive_halving
+from src.utils.utils import RollingAnnualTimeSeriesSplit
+
+CANDIDATES = [{"alpha": 0.1}, {"alpha": 10.0}, {"alpha": 1000.0}]
+
+
+def _search(X, y, checkpoint, **kwargs):
+    splitter = RollingAnnualTimeSeriesSplit(n_splits=3, goback_years=2)
+    return successive_halving(X, y, splitter, Ridge(), CANDIDATES, checkpoint=checkpoint,
+                              **kwargs)
+
+
+def test_resume_skips_recorded_units_and_a_partial_line(daily_peaks, tmp_path):
+    X, y = daily_peaks
+    checkpoint = tmp_path / "search.jsonl"
+    expected = _search(X, y, checkpoint)
+    lines = checkpoint.read_text().splitlines(keepends=True)
+    assert json.loads(lines[0])["header"] == 1
+
+    # An interrupted run: the last unit was only partly written
+    checkpoint.write_text("".join(lines[:-1]) + lines[-1][:10])
+    resumed = _search(X, y, checkpoint)
+
+    assert resumed.equals(expected)
+    assert checkpoint.read_text().splitlines(keepends=True) == lines
+
+
+def test_mismatched_checkpoint_is_refused_or_restarted(daily_peaks, tmp_path):
+    X, y = daily_peaks
+    checkpoint = tmp_path / "search.jsonl"
+    _search(X, y, checkpoint)
+
+    with pytest.raises(ValueError, match="restart_checkpoint"):
+        _search(X, y + 1, checkpoint)
+    with pytest.raises(ValueError, match="restart_checkpoint"):
+        _search(X.assign(temp=X["temp"] * 2), y, checkpoint)
+
+    restarted = _search(X, y + 1, checkpoint, restart_checkpoint=True)
+    assert restarted.equals(_search(X, y + 1, tmp_path / "fresh.jsonl"))
+    assert checkpoint.read_text() == (tmp_path / "fresh.jsonl").read_text()
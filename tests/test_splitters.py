@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils.utils import AnnualTimeSeriesSplit, RollingAnnualTimeSeriesSplit
+
+
+def _old_annual_split(X, n_splits):
+    # AnnualTimeSeriesSplit.split before it was rebased on AnnualWindowSplit
+    years = X.index.year.unique()
+    for ind, year in enumerate(years[0:n_splits]):
+        final_train_year = years[-1] - n_splits + ind
+        train_final_index = X.index.get_loc(str(final_train_year)).stop
+        test_final_index = X.index.get_loc(str(final_train_year + 1)).stop
+        yield list(range(0, train_final_index)), list(range(train_final_index, test_final_index))
+
+
+def _old_rolling_split(X, n_splits, goback_years):
+    # RollingAnnualTimeSeriesSplit.split before it was rebased on AnnualWindowSplit
+    years = X.index.year.unique()
+    for ind, year in enumerate(years[0:n_splits]):
+        final_train_year = years[-1] - n_splits + ind
+        start_train_year = final_train_year - goback_years + 1
+        train_start_index = X.index.get_loc(str(start_train_year)).start
+        train_final_index = X.index.get_loc(str(final_train_year)).stop
+        test_final_index = X.index.get_loc(str(final_train_year + 1)).stop
+        yield (list(range(train_start_index, train_final_index)),
+               list(range(train_final_index, test_final_index)))
+
+
+def _positions(folds, n_rows):
+    # The new splitters yield slices, the old ones lists of positions
+    rows = np.arange(n_rows)
+    return [(list(rows[train]), list(rows[test])) for train, test in folds]
+
+
+HOURLY = pd.date_range("2008-01-01", "2015-12-31 23:00", freq="h")
+# The notebooks' summer peak data: no row falls on any year boundary
+SUMMER = pd.date_range("2008-01-01", "2015-12-31", freq="D")
+SUMMER = SUMMER[SUMMER.month.isin([6, 7, 8, 9])]
+# A gap over New Year, so the 1st of January of 2013 is missing
+GAP = pd.date_range("2008-01-01", "2015-12-31", freq="D")
+GAP = GAP[(GAP < "2012-12-20") | (GAP > "2013-01-10")]
+
+
+@pytest.fixture(params=[HOURLY, SUMMER, GAP], ids=["hourly", "summer", "new_year_gap"])
+def X(request):
+    return pd.DataFrame({"temp": np.arange(len(request.param), dtype=float)},
+                        index=request.param)
+
+
+@pytest.mark.parametrize("n_splits", [1, 3, 5])
+def test_annual_folds_match_the_old_splitter(X, n_splits):
+    new = _positions(AnnualTimeSeriesSplit(n_splits).split(X), len(X))
+    assert new == list(_old_annual_split(X, n_splits))
+
+
+@pytest.mark.parametrize("n_splits, goback_years", [(1, 1), (3, 2), (4, 4)])
+def test_rolling_folds_match_the_old_splitter(X, n_splits, goback_years):
+    new = _positions(RollingAnnualTimeSeriesSplit(n_splits, goback_years).split(X), len(X))
+    assert new == list(_old_rolling_split(X, n_splits, goback_years))
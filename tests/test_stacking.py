@@ -0,0 +1,79 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.linear_model import Ridge
+from sklearn.neighbors import KNeighborsRegressor
+from sklearn.tree import DecisionTreeRegressor
+
+from src.models.models import AveragingRegressor, BaseFitMemo, ResidualStackRegressor
+
+
+class CountingRidge(Ridge):
+    n_fits = 0
+
+    def fit(self, X, y, sample_weight=None):
+        CountingRidge.n_fits += 1
+        return super().fit(X, y, sample_weight)
+
+
+def _tree():
+    return DecisionTreeRegressor(max_depth=3, random_state=0)
+
+
+def _stacks(memo):
+    return (ResidualStackRegressor(CountingRidge(alpha=1.0), _tree(), base_memo=memo),
+            ResidualStackRegressor(CountingRidge(alpha=1.0), KNeighborsRegressor(5),
+                                   base_memo=memo))
+
+
+def test_shared_base_config_is_fitted_once_and_stacks_stay_independent(daily_peaks):
+    X, y = daily_peaks
+    X_train, y_train, X_test = X.loc["2014"], y.loc["2014"], X.loc["2015"]
+    CountingRidge.n_fits = 0
+    tree_stack, knn_stack = _stacks(BaseFitMemo())
+
+    tree_stack.fit(X_train, y_train)
+    knn_stack.fit(X_train, y_train)
+    assert CountingRidge.n_fits == 1
+    assert tree_stack.base_model_ is not knn_stack.base_model_
+    knn_before = knn_stack.predict(X_test)
+
+    # Changing or refitting one stack's base model leaves the other, and the memo, alone
+    tree_stack.base_model_.coef_ += 100.0
+    tree_stack.base_model_.fit(X_test, y.loc["2015"])
+    pd.testing.assert_series_equal(knn_stack.predict(X_test), knn_before)
+    knn_again = clone(knn_stack).fit(X_train, y_train)
+    pd.testing.assert_series_equal(knn_again.predict(X_test), knn_before)
+    assert CountingRidge.n_fits == 2
+
+
+def test_stack_matches_its_parts_with_or_without_a_memo(daily_peaks):
+    X, y = daily_peaks
+    X_train, y_train, X_test = X.loc["2014"], y.loc["2014"], X.loc["2015"]
+
+    memoised = _stacks(BaseFitMemo())[0].fit(X_train, y_train)
+    plain = ResidualStackRegressor(Ridge(), _tree()).fit(X_train, y_train)
+    base = Ridge().fit(X_train, y_train)
+    residual = _tree().fit(X_train, y_train - base.predict(X_train))
+
+    expected = base.predict(X_test) + residual.predict(X_test)
+    np.testing.assert_allclose(memoised.predict(X_test).values, expected)
+    np.testing.assert_allclose(plain.predict(X_test).values, expected)
+
+    averaged = AveragingRegressor([memoised, plain], weights=[1, 3]).fit(X_train, y_train)
+    np.testing.assert_allclose(averaged.predict(X_test).values, expected)
+
+
+def test_memo_is_shared_by_clones_and_pickled_empty(daily_peaks):
+    X, y = daily_peaks
+    memo = BaseFitMemo(max_entries=1)
+    stack = _stacks(memo)[0].fit(X.loc["2014"], y.loc["2014"])
+    _stacks(memo)[0].fit(X.loc["2013"], y.loc["2013"])
+
+    assert clone(stack).base_memo is memo
+    assert len(memo) == 1
+    restored = pickle.loads(pickle.dumps(stack))
+    assert len(restored.base_memo) == 0 and restored.base_memo.max_entries == 1
+    pd.testing.assert_series_equal(restored.predict(X.loc["2015"]), stack.predict(X.loc["2015"]))
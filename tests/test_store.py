@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.store import iter_hourly, load_hourly, write_hourly_store
+
+
+def _mapping(values):
+    # The np.memmap a view was taken from, if any
+    while values is not None and not isinstance(values, np.memmap):
+        values = values.base
+    return values
+
+
+@pytest.fixture
+def store_dir(tmp_path):
+    index = pd.date_range('2016-12-31', '2018-01-01 23:00', freq='h', name='date')
+    df = pd.DataFrame({'hourly_demand': np.arange(len(index), dtype=float),
+                       'temp': np.linspace(-10, 30, len(index)),
+                       'hour_of_day': index.hour}, index=index)
+    write_hourly_store(df, tmp_path)
+    return tmp_path
+
+
+def test_a_single_year_is_memory_mapped(store_dir):
+    df = load_hourly(store_dir, years=[2017], columns=['hourly_demand', 'temp'])
+
+    assert len(df) == 365 * 24
+    for column in df.columns:
+        assert _mapping(df[column].values) is not None
+
+
+def test_iter_hourly_maps_each_year_and_matches_load_hourly(store_dir):
+    pairs = list(iter_hourly(store_dir))
+
+    assert [year for year, _ in pairs] == [2016, 2017, 2018]
+    assert all(_mapping(frame['temp'].values) is not None for _, frame in pairs)
+    pd.testing.assert_frame_equal(pd.concat([frame for _, frame in pairs]),
+                                  load_hourly(store_dir))
+
+
+def test_missing_years_raise(store_dir):
+    with pytest.raises(KeyError):
+        load_hourly(store_dir, years=[2015, 2017])
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.models.streaming as streaming
+
+from src.models.estimators import SK_SARIMAX
+from src.models.streaming import StreamingSARIMAX
+
+
+def _hourly_demand():
+    rng = np.random.RandomState(0)
+    index = pd.date_range("2018-06-01", "2018-06-21 23:00", freq="h")
+    X = pd.DataFrame({"temp": 22 + 6 * np.sin(2 * np.pi * (index.hour - 9) / 24)
+                              + rng.normal(size=len(index))}, index=index)
+    y = pd.Series(15000 + 300 * X["temp"] + rng.normal(scale=100, size=len(index)),
+                  index=index, name="ont_demand")
+    return X, y
+
+
+def _fit(X, y):
+    model = SK_SARIMAX(order=(1, 0, 0), seasonal_order=(0, 0, 0, 0))
+    model.fit(X, y)
+    return model
+
+
+def test_daily_model_peaks_use_the_forecast_intervals(daily_peaks):
+    X, y = daily_peaks
+    stream = StreamingSARIMAX(_fit(X.loc["2015-06":"2015-08"], y.loc["2015-06":"2015-08"]))
+
+    peaks = stream.peak_forecast(X.loc["2015-09-01":"2015-09-03"])
+    hourly = stream.hourly_forecast(X.loc["2015-09-01":"2015-09-03"])
+
+    assert (peaks["n_forecast"] == 1).all()
+    np.testing.assert_allclose(peaks[["yhat", "yhat_lower", "yhat_upper"]].values,
+                               hourly[["yhat", "yhat_lower", "yhat_upper"]].values)
+
+
+def test_hourly_model_peak_intervals_come_from_simulated_paths():
+    X, y = _hourly_demand()
+    fit_end = "2018-06-20 11:00"
+    stream = StreamingSARIMAX(_fit(X.loc[:fit_end], y.loc[:fit_end]), n_paths=4000, seed=0)
+    X_ahead = X.loc["2018-06-20 12:00":]
+
+    peaks = stream.peak_forecast(X_ahead)
+    hourly = stream.hourly_forecast(X_ahead)
+    hourly_bounds = hourly.groupby(hourly.index.normalize()).max()
+
+    assert peaks["n_forecast"].tolist() == [12, 24]
+    assert peaks.equals(StreamingSARIMAX(stream.model, n_paths=4000, seed=0).peak_forecast(X_ahead))
+    # The peak of several hours is above each hour's quantiles
+    assert (peaks["yhat_lower"] > hourly_bounds["yhat_lower"]).all()
+    assert (peaks["yhat_upper"] >= hourly_bounds["yhat_upper"] - 1).all()
+    assert (peaks["yhat_lower"] >= peaks["y"].fillna(-np.inf)).all()
+
+
+def _stream_in_chunks(model, X, y, chunk_sizes):
+    stream = StreamingSARIMAX(model)
+    start = 0
+    for size in chunk_sizes:
+        stream.update(X.iloc[start:start + size], y.iloc[start:start + size])
+        start += size
+    assert start == len(y)
+    return stream
+
+
+def _refiltered_forecast(model, X_full, y_full, X_ahead):
+    # A single filter pass over the fit data and the streamed data, with the fitted parameters
+    results = model.results.apply(y_full, exog=model._exog(X_full, 0))
+    forecast = results.get_forecast(steps=len(X_ahead),
+                                    exog=model._exog(X_ahead, len(y_full)))
+    return np.asarray(forecast.predicted_mean), forecast.conf_int(alpha=0.05).values
+
+
+def test_hourly_updates_match_a_refilter_over_the_full_series():
+    X, y = _hourly_demand()
+    fit_end, stream_end = "2018-06-15 23:00", "2018-06-20 11:00"
+    model = _fit(X.loc[:fit_end], y.loc[:fit_end])
+    streamed = slice("2018-06-16 00:00", stream_end)
+    stream = _stream_in_chunks(model, X.loc[streamed], y.loc[streamed], [1, 6, 24, 48, 29])
+    X_ahead = X.loc["2018-06-20 12:00":]
+
+    yhat, bounds = _refiltered_forecast(model, X.loc[:stream_end], y.loc[:stream_end], X_ahead)
+    hourly = stream.hourly_forecast(X_ahead)
+    np.testing.assert_allclose(hourly["yhat"].values, yhat)
+    np.testing.assert_allclose(hourly[["yhat_lower", "yhat_upper"]].values, bounds)
+    today = pd.Timestamp("2018-06-20")
+    assert stream.observed_peaks[today] == y.loc[today:stream_end].max()
+
+
+def test_fourier_daily_updates_match_a_refilter_over_the_full_series(daily_peaks):
+    X, y = daily_peaks
+    model = SK_SARIMAX(order=(1, 0, 0), seasonal_order=(0, 0, 0, 7), fourier_order=2)
+    model.fit(X.loc["2015-01":"2015-05"], y.loc["2015-01":"2015-05"])
+    stream = _stream_in_chunks(model, X.loc["2015-06"], y.loc["2015-06"], [1, 3, 7, 19])
+    X_ahead = X.loc["2015-07-01":"2015-07-10"]
+
+    yhat, bounds = _refiltered_forecast(model, X.loc["2015-01":"2015-06"],
+                                        y.loc["2015-01":"2015-06"], X_ahead)
+    peaks = stream.peak_forecast(X_ahead)
+    np.testing.assert_allclose(peaks["yhat"].values, yhat)
+    np.testing.assert_allclose(peaks[["yhat_lower", "yhat_upper"]].values, bounds)
+    assert peaks["y"].isna().all()
+
+
+def test_streaming_needs_statsmodels_0_11(daily_peaks, monkeypatch):
+    X, y = daily_peaks
+    model = _fit(X.loc["2015-06"], y.loc["2015-06"])
+    monkeypatch.setattr(streaming, "_statsmodels_version", lambda: (0, 10))
+    with pytest.raises(ImportError, match="0.11"):
+        StreamingSARIMAX(model)
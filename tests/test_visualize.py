@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.visualization.visualize import downsample_pred_values, lttb_indices
+
+
+def _reference_lttb(x, y, n_out):
+    # Steinarsson's Largest-Triangle-Three-Buckets, one point at a time. The bucket edges
+    # floor(i * (n - 2) / (n_out - 2)) + 1 are in integers, as float division can round one down
+    n = len(x)
+
+    def edge(i):
+        return i * (n - 2) // (n_out - 2) + 1
+
+    selected, previous = [0], 0
+    for i in range(n_out - 2):
+        avg_start, avg_end = edge(i + 1), min(edge(i + 2), n)
+        avg_x = sum(x[avg_start:avg_end]) / (avg_end - avg_start)
+        avg_y = sum(y[avg_start:avg_end]) / (avg_end - avg_start)
+
+        start, stop = edge(i), edge(i + 1)
+        best, best_area = start, -1.0
+        for j in range(start, stop):
+            area = abs((x[previous] - avg_x) * (y[j] - y[previous])
+                       - (x[previous] - x[j]) * (avg_y - y[previous]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        previous = best
+    selected.append(n - 1)
+    return selected
+
+
+@pytest.mark.parametrize("n, n_out", [(1000, 100), (1001, 37), (250, 249), (50, 3)])
+def test_lttb_matches_the_reference(n, n_out):
+    rng = np.random.RandomState(n)
+    x = np.cumsum(rng.uniform(0.5, 1.5, n))
+    y = np.sin(x / 20) + rng.normal(scale=0.3, size=n)
+
+    assert lttb_indices(x, y, n_out).tolist() == _reference_lttb(x, y, n_out)
+
+
+def test_downsampling_keeps_the_forecasts_and_yearly_peaks():
+    rng = np.random.RandomState(0)
+    index = pd.date_range('2010-01-01', '2015-12-31', freq='D')
+    y = pd.Series(rng.normal(size=len(index)), index=index)
+    df = pd.DataFrame({'y': y, 'yhat': y + rng.normal(scale=0.1, size=len(index))})
+    oos_start = pd.Timestamp('2015-01-01')
+
+    small = downsample_pred_values(df, 300, oos_start, keep_peaks=3)
+
+    assert small.index.is_monotonic_increasing
+    assert small.index.isin(df.index).all()
+    assert (small.index >= oos_start).sum() == (df.index >= oos_start).sum()
+    assert (small.index < oos_start).sum() < 400
+    for column in ('y', 'yhat'):
+        peaks = df[column].groupby(df.index.year).nlargest(3).index.get_level_values(-1)
+        assert peaks.isin(small.index).all()
@@ -0,0 +1,110 @@
+import collections
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from src.data import weather
+
+STATIONS = {5097: (2018, 2018)}
+CSV_HEADER = '"Date/Time","Year","Month","Day","Time","Temp (°C)","Rel Hum (%)","Weather"\n'
+
+
+class WeatherServer:
+    """
+    A stand-in for the bulk data endpoint. failures maps (station_id, year, month) to the
+    number of 503 responses to send before the month's CSV, or None to always fail
+    """
+
+    def __init__(self):
+        self.failures = {}
+        self.requests = collections.Counter()
+        self.lock = threading.Lock()
+
+    def respond(self, handler):
+        query = parse_qs(urlparse(handler.path).query)
+        key = tuple(int(query[name][0]) for name in ('stationID', 'Year', 'Month'))
+        with self.lock:
+            self.requests[key] += 1
+            remaining = self.failures.get(key, 0)
+            if remaining:
+                self.failures[key] = None if remaining is None else remaining - 1
+        if remaining is None or remaining > 0:
+            handler.send_response(503)
+            handler.end_headers()
+            return
+
+        station_id, year, month = key
+        rows = ''.join(f'"{year}-{month:02d}-01 {hour:02d}:00","{year}","{month:02d}","01",'
+                       f'"{hour:02d}:00","{hour + month / 10}","50",""\n' for hour in range(3))
+        body = ('"Station Name","TORONTO"\n\n' + CSV_HEADER + rows).encode('utf-8-sig')
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'text/csv; charset=utf-8')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+
+@pytest.fixture
+def weather_server():
+    server_state = WeatherServer()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            server_state.respond(self)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    server_state.url = f'http://127.0.0.1:{httpd.server_address[1]}/bulk_data_e.html'
+    yield server_state
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_transient_errors_are_retried(weather_server, tmp_path):
+    weather_server.failures[(5097, 2018, 3)] = 2
+
+    fetched = weather.ingest_weather(tmp_path, STATIONS, base_url=weather_server.url,
+                                     max_workers=4, backoff_factor=0)
+
+    assert sorted(fetched) == weather.station_months(STATIONS)
+    assert set(fetched.values()) == {3}
+    assert weather_server.requests[(5097, 2018, 3)] == 3
+    assert len(weather.load_weather(tmp_path)) == 36
+
+
+def test_partial_failure_keeps_fetched_months_and_resumes(weather_server, tmp_path):
+    weather_server.failures[(5097, 2018, 7)] = None
+
+    with pytest.raises(RuntimeError, match='1 of 12'):
+        weather.ingest_weather(tmp_path, STATIONS, base_url=weather_server.url,
+                               max_workers=4, retries=1, backoff_factor=0)
+    assert len(weather.load_weather(tmp_path)) == 33
+
+    weather_server.failures.clear()
+    weather_server.requests.clear()
+    fetched = weather.ingest_weather(tmp_path, STATIONS, base_url=weather_server.url,
+                                     max_workers=4, backoff_factor=0)
+    assert list(fetched) == [(5097, 2018, 7)]
+    assert list(weather_server.requests) == [(5097, 2018, 7)]
+    assert len(weather.load_weather(tmp_path)) == 36
+
+
+def test_each_worker_thread_has_its_own_session(weather_server, tmp_path, monkeypatch):
+    users = collections.defaultdict(set)
+    fetch_month = weather.fetch_month
+
+    def recording_fetch_month(session, *args, **kwargs):
+        users[id(session)].add(threading.get_ident())
+        return fetch_month(session, *args, **kwargs)
+
+    monkeypatch.setattr(weather, 'fetch_month', recording_fetch_month)
+    weather.ingest_weather(tmp_path, STATIONS, base_url=weather_server.url, max_workers=4)
+
+    assert 1 <= len(users) <= 4
+    assert all(len(threads) == 1 for threads in users.values())